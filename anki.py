@@ -1,33 +1,166 @@
+import base64
 import os
+import threading
+import time
 import requests
+import http_client
 from typing import Optional
-from config import ANKI_CONNECT_URL, ANKI_DECK_NAME, ANKI_MODEL_NAME
+from config import (
+    ANKI_CONNECT_URL, ANKI_DECK_NAME, ANKI_MODEL_NAME, ANKI_BATCH_SIZE,
+    ANKI_HEALTH_TTL_SECONDS, ANKI_CIRCUIT_FAILURE_THRESHOLD, ANKI_CIRCUIT_RESET_SECONDS, ANKI_DECKS_TTL_SECONDS,
+)
+
+
+# actions that only read, so they can be retried safely
+READ_ONLY_ACTIONS = {'version', 'deckNames', 'modelNames', 'findNotes', 'notesInfo', 'cardsInfo'}
+
+# actions that can add, remove or rename decks, so the cached deck list is dropped
+DECK_ACTIONS = {'createDeck', 'deleteDecks', 'changeDeck', 'importPackage'}
+
+
+class AnkiUnreachable(Exception):
+    """AnkiConnect couldn't be reached, as opposed to Anki rejecting a request."""
+
+
+class AnkiHealth:
+    """
+    Cached AnkiConnect reachability with a circuit breaker.
+
+    Every AnkiConnect call reports its outcome here, and a background thread
+    probes with `version` when nothing has been seen for half the TTL, so
+    is_anki_running() answers from memory. After `failure_threshold`
+    connection failures in a row the circuit opens: calls fail at once
+    instead of waiting on a refused connection, and only the background
+    probe (every `reset_seconds`) talks to Anki until it answers again.
+
+    Also holds the deck list for `decks_ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = ANKI_HEALTH_TTL_SECONDS,
+        failure_threshold: int = ANKI_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = ANKI_CIRCUIT_RESET_SECONDS,
+        decks_ttl_seconds: float = ANKI_DECKS_TTL_SECONDS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.decks_ttl_seconds = decks_ttl_seconds
+        self.reachable = None        # last observed state, None before the first call
+        self.checked_at = 0.0        # time.monotonic() of that observation
+        self.failures = 0            # consecutive connection failures
+        self.opened_at = None        # set while the circuit is open
+        self._decks = None
+        self._decks_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                # Anki was restarted; its decks may have changed meanwhile
+                print('AnkiConnect reachable again, circuit closed')
+                self._decks = None
+            self.reachable = True
+            self.failures = 0
+            self.opened_at = None
+            self.checked_at = time.monotonic()
+
+    def record_failure(self):
+        with self._lock:
+            self.reachable = False
+            self.failures += 1
+            self.checked_at = time.monotonic()
+            if self.opened_at is None and self.failures >= self.failure_threshold:
+                print(f'AnkiConnect unreachable {self.failures} times in a row, circuit open')
+                self.opened_at = self.checked_at
+
+    def probe(self) -> bool:
+        try:
+            _ankiconnect('version')
+            return True
+        except Exception:
+            return False
+
+    def is_running(self) -> bool:
+        self.start()
+        if self.opened_at is not None:
+            return False
+        if self.reachable is not None and time.monotonic() - self.checked_at < self.ttl_seconds:
+            return self.reachable
+        return self.probe()
+
+    def decks(self, refresh: bool = False) -> list[str]:
+        if not refresh and self._decks is not None and time.monotonic() - self._decks_at < self.decks_ttl_seconds:
+            return list(self._decks)
+        decks = _ankiconnect('deckNames')
+        with self._lock:
+            self._decks = decks
+            self._decks_at = time.monotonic()
+        return list(decks)
+
+    def invalidate_decks(self):
+        with self._lock:
+            self._decks = None
+
+    def start(self):
+        """Start the background probe (once; called lazily on first use)."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='anki-health', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            # probe before the cached state expires; slower while the circuit is open
+            interval = self.reset_seconds if self.opened_at is not None else self.ttl_seconds / 2
+            idle = time.monotonic() - self.checked_at
+            if idle >= interval:
+                self.probe()
+                idle = 0
+            time.sleep(interval - idle)
+
+
+health = AnkiHealth()
 
 
 def _ankiconnect(action: str, **params):
     """Send a request to the AnkiConnect plugin."""
+    if health.circuit_open and action != 'version':
+        raise AnkiUnreachable('Anki is not running or AnkiConnect is not installed')
+
     payload = {'action': action, 'version': 6, 'params': params}
     try:
-        response = requests.post(ANKI_CONNECT_URL, json=payload, timeout=5)
-        response.raise_for_status()
-        result = response.json()
-        if result.get('error'):
-            raise Exception(result['error'])
-        return result.get('result')
-    except requests.exceptions.ConnectionError:
-        raise Exception(
+        response = http_client.post(ANKI_CONNECT_URL, idempotent=action in READ_ONLY_ACTIONS, json=payload)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError):
+        health.record_failure()
+        raise AnkiUnreachable(
             'Could not connect to AnkiConnect. '
             'Make sure Anki is running and the AnkiConnect plugin is installed.'
         )
+    health.record_success()
+
+    response.raise_for_status()
+    result = response.json()
+    if action in DECK_ACTIONS or (
+        action == 'multi' and any(a['action'] in DECK_ACTIONS for a in params.get('actions', []))
+    ):
+        health.invalidate_decks()
+    if result.get('error'):
+        raise Exception(result['error'])
+    return result.get('result')
 
 
 def is_anki_running() -> bool:
-    """Check whether Anki is open and AnkiConnect is reachable."""
-    try:
-        _ankiconnect('version')
-        return True
-    except Exception:
-        return False
+    """Whether Anki is open and AnkiConnect is reachable (cached; see AnkiHealth)."""
+    return health.is_running()
 
 
 def _build_inflections_html(definitions: list) -> str:
@@ -137,7 +270,7 @@ def _build_images_html(image_urls: list) -> str:
         )
 
 
-def add_card(
+def build_card_note(
     word: str,
     article: Optional[str],
     definitions: list,
@@ -145,9 +278,9 @@ def add_card(
     audio_path: Optional[str],
     image_urls: list,
     deck: str = ANKI_DECK_NAME,
-) -> int:
+) -> dict:
     """
-    Create an Anki card with all definitions for a word.
+    Build the AnkiConnect note for a card with all definitions for a word.
     Each definition is numbered and includes its translation, Swedish definition,
     examples, and synonyms. Supports up to 4 images.
     """
@@ -221,32 +354,42 @@ def add_card(
 
     back = '<br><br>'.join(back_parts)
 
-    note_id = _ankiconnect(
-        'addNote',
-        note={
-            'deckName': deck,
-            'modelName': ANKI_MODEL_NAME,
-            'fields': {
-                'Front': front,
-                'Back': back,
-            },
-            'tags': ['swedish', 'word-card', 'forward-card'] + [wc.lower() for wc in word_classes if wc],
-            'options': {
-                'allowDuplicate': False,
-                'duplicateScope': 'deck',
-            }
+    return {
+        'deckName': deck,
+        'modelName': ANKI_MODEL_NAME,
+        'fields': {
+            'Front': front,
+            'Back': back,
+        },
+        'tags': ['swedish', 'word-card', 'forward-card'] + [wc.lower() for wc in word_classes if wc],
+        'options': {
+            'allowDuplicate': False,
+            'duplicateScope': 'deck',
         }
-    )
+    }
 
-    return note_id
 
+def add_card(
+    word: str,
+    article: Optional[str],
+    definitions: list,
+    word_classes: list,
+    audio_path: Optional[str],
+    image_urls: list,
+    deck: str = ANKI_DECK_NAME,
+) -> int:
+    """Create an Anki card with all definitions for a word (see build_card_note)."""
+    return _ankiconnect('addNote', note=build_card_note(
+        word, article, definitions, word_classes, audio_path, image_urls, deck
+    ))
 
-def get_decks() -> list[str]:
-    """Return all deck names from Anki."""
-    return _ankiconnect('deckNames')
 
+def get_decks(refresh: bool = False) -> list[str]:
+    """Return all deck names from Anki (cached for ANKI_DECKS_TTL_SECONDS unless `refresh`)."""
+    return health.decks(refresh=refresh)
 
-def add_reverse_card(
+
+def build_reverse_card_note(
     word: str,
     article: Optional[str],
     definitions: list,
@@ -254,9 +397,9 @@ def add_reverse_card(
     audio_path: Optional[str],
     image_urls: list,
     deck: str = ANKI_DECK_NAME,
-) -> int:
+) -> dict:
     """
-    Create a reverse Anki card (images + definitions → word).
+    Build the AnkiConnect note for a reverse card (images + definitions → word).
     The front shows up to 4 images with collapsible definition hints.
     The back shows the Swedish word with phonetic, audio, and inflections.
     """
@@ -313,21 +456,77 @@ def add_reverse_card(
 
     back = ''.join(back_parts)
 
-    note_id = _ankiconnect(
-        'addNote',
-        note={
-            'deckName': deck,
-            'modelName': ANKI_MODEL_NAME,
-            'fields': {
-                'Front': front,
-                'Back': back,
-            },
-            'tags': ['swedish', 'word-card', 'reverse-card'],
-            'options': {
-                'allowDuplicate': False,
-                'duplicateScope': 'deck',
-            }
+    return {
+        'deckName': deck,
+        'modelName': ANKI_MODEL_NAME,
+        'fields': {
+            'Front': front,
+            'Back': back,
+        },
+        'tags': ['swedish', 'word-card', 'reverse-card'],
+        'options': {
+            'allowDuplicate': False,
+            'duplicateScope': 'deck',
         }
-    )
+    }
+
+
+def add_reverse_card(
+    word: str,
+    article: Optional[str],
+    definitions: list,
+    phonetic: Optional[str],
+    audio_path: Optional[str],
+    image_urls: list,
+    deck: str = ANKI_DECK_NAME,
+) -> int:
+    """Create a reverse Anki card (see build_reverse_card_note)."""
+    return _ankiconnect('addNote', note=build_reverse_card_note(
+        word, article, definitions, phonetic, audio_path, image_urls, deck
+    ))
+
 
-    return note_id
\ No newline at end of file
+def add_notes(notes: list, media_files: Optional[list] = None) -> list[dict]:
+    """
+    Upload media and add many notes in one AnkiConnect `multi` request per
+    ANKI_BATCH_SIZE actions, instead of a round trip per note. Anki's plugin
+    is single-threaded, so this is much gentler for bulk deck building.
+
+    media_files is a list of (filename, bytes), stored before the notes that
+    reference them. Returns one {'note_id': id} or {'error': message} per
+    note, in order. A chunk whose request fails (e.g. Anki closed mid-write)
+    only marks its own notes as errored; notes in earlier chunks are already
+    in Anki and keep their ids. Errors from Anki not being reachable also
+    carry 'unreachable': True, so the caller can queue those notes instead.
+    """
+    media_files = media_files or []
+    actions = [
+        {'action': 'storeMediaFile', 'version': 6,
+         'params': {'filename': filename, 'data': base64.b64encode(data).decode('ascii')}}
+        for filename, data in media_files
+    ]
+    actions += [{'action': 'addNote', 'version': 6, 'params': {'note': note}} for note in notes]
+
+    responses = []
+    for start in range(0, len(actions), ANKI_BATCH_SIZE):
+        chunk = actions[start:start + ANKI_BATCH_SIZE]
+        try:
+            responses += _ankiconnect('multi', actions=chunk)
+        except AnkiUnreachable as e:
+            responses += [{'result': None, 'error': str(e), 'unreachable': True}] * len(chunk)
+        except Exception as e:
+            responses += [{'result': None, 'error': str(e)}] * len(chunk)
+
+    for (filename, _), response in zip(media_files, responses[:len(media_files)]):
+        if response.get('error'):
+            print(f'Storing media {filename} failed: {response["error"]}')
+
+    outcomes = []
+    for response in responses[len(media_files):]:
+        if response.get('unreachable'):
+            outcomes.append({'error': response['error'], 'unreachable': True})
+        elif response.get('error'):
+            outcomes.append({'error': response['error']})
+        else:
+            outcomes.append({'note_id': response['result']})
+    return outcomes
@@ -0,0 +1,379 @@
+"""
+Direct .apkg export: writes cards into a self-contained Anki package
+(SQLite collection + media) without AnkiConnect or a running Anki.
+
+    python apkg.py cards.jsonl Swedish.apkg [--generate]
+
+cards.jsonl holds one card per line with the same fields as /create-card
+(word, definitions, article, audio_path, image_urls, deck, create_reverse).
+Notes are built with the same HTML builders as anki.add_card and
+anki.add_reverse_card. Notes and media are written to disk as they arrive,
+so memory stays flat for thousands of cards. Note GUIDs, note type and deck
+ids are derived from the content's identity, so importing a re-export
+updates the existing notes instead of duplicating them.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from typing import Optional
+
+from anki import build_card_note, build_reverse_card_note
+from config import ANKI_DECK_NAME, ANKI_MEDIA_DIR, ANKI_MODEL_NAME
+from media import fetch_image
+
+# legacy (schema 11) collection, which every Anki version can import
+SCHEMA = '''
+CREATE TABLE col (
+    id integer primary key, crt integer not null, mod integer not null,
+    scm integer not null, ver integer not null, dty integer not null,
+    usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null,
+    tags text not null
+);
+CREATE TABLE notes (
+    id integer primary key, guid text not null, mid integer not null,
+    mod integer not null, usn integer not null, tags text not null,
+    flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null
+);
+CREATE TABLE cards (
+    id integer primary key, nid integer not null, did integer not null,
+    ord integer not null, mod integer not null, usn integer not null,
+    type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null,
+    odid integer not null, flags integer not null, data text not null
+);
+CREATE TABLE revlog (
+    id integer primary key, cid integer not null, usn integer not null,
+    ease integer not null, ivl integer not null, lastIvl integer not null,
+    factor integer not null, time integer not null, type integer not null
+);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_usn ON notes (usn);
+CREATE INDEX ix_cards_usn ON cards (usn);
+CREATE INDEX ix_revlog_usn ON revlog (usn);
+CREATE INDEX ix_cards_nid ON cards (nid);
+CREATE INDEX ix_cards_sched ON cards (did, queue, due);
+CREATE INDEX ix_revlog_cid ON revlog (cid);
+CREATE INDEX ix_notes_csum ON notes (csum);
+'''
+
+FIELD_SEPARATOR = '\x1f'
+
+DEFAULT_DECK_CONFIG = {
+    'id': 1, 'name': 'Default', 'mod': 0, 'usn': 0, 'maxTaken': 60, 'autoplay': True,
+    'timer': 0, 'replayq': True, 'dyn': False,
+    'new': {'bury': True, 'delays': [1, 10], 'initialFactor': 2500, 'ints': [1, 4, 7],
+            'order': 1, 'perDay': 20, 'separate': True},
+    'lapse': {'delays': [10], 'leechAction': 0, 'leechFails': 8, 'minInt': 1, 'mult': 0},
+    'rev': {'bury': True, 'ease4': 1.3, 'fuzz': 0.05, 'ivlFct': 1, 'maxIvl': 36500,
+            'minSpace': 1, 'perDay': 100},
+}
+
+CARD_CSS = (
+    '.card {\n font-family: arial;\n font-size: 20px;\n text-align: center;\n'
+    ' color: black;\n background-color: white;\n}\n'
+)
+
+_TAG = re.compile(r'<[^>]+>')
+
+
+def _stable_id(*parts: str) -> int:
+    """Deterministic positive id that fits Anki's integer columns."""
+    digest = hashlib.sha1('\x00'.join(parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:6], 'big') + 1
+
+
+def note_guid(word: str, card: str) -> str:
+    """Deterministic GUID per (word, card kind), so re-exports update notes on import."""
+    digest = hashlib.sha1(f'swedish-anki:{card}:{word}'.encode('utf-8')).digest()
+    return base64.b64encode(digest[:9]).decode('ascii')
+
+
+def _field_checksum(text: str) -> int:
+    return int(hashlib.sha1(_TAG.sub('', text).encode('utf-8')).hexdigest()[:8], 16)
+
+
+def _basic_model(model_id: int, name: str, now: int) -> dict:
+    """The Basic (Front/Back) note type the AnkiConnect path writes to."""
+    field = {'sticky': False, 'rtl': False, 'font': 'Arial', 'size': 20, 'media': []}
+    return {
+        'id': model_id, 'name': name, 'type': 0, 'mod': now, 'usn': -1, 'sortf': 0, 'did': 1,
+        'tmpls': [{
+            'name': 'Card 1', 'ord': 0, 'did': None, 'bqfmt': '', 'bafmt': '',
+            'qfmt': '{{Front}}', 'afmt': '{{FrontSide}}\n\n<hr id=answer>\n\n{{Back}}',
+        }],
+        'flds': [{'name': 'Front', 'ord': 0, **field}, {'name': 'Back', 'ord': 1, **field}],
+        'css': CARD_CSS,
+        'latexPre': '\\documentclass[12pt]{article}\n\\special{papersize=3in,5in}\n\\usepackage{amssymb,amsmath}\n'
+                    '\\pagestyle{empty}\n\\setlength{\\parindent}{0in}\n\\begin{document}\n',
+        'latexPost': '\\end{document}',
+        'tags': [], 'vers': [], 'req': [[0, 'any', [0]]],
+    }
+
+
+def _deck(deck_id: int, name: str, now: int) -> dict:
+    return {
+        'id': deck_id, 'name': name, 'mod': now, 'usn': -1, 'collapsed': False,
+        'newToday': [0, 0], 'revToday': [0, 0], 'lrnToday': [0, 0], 'timeToday': [0, 0],
+        'dyn': 0, 'conf': 1, 'desc': '', 'extendNew': 10, 'extendRev': 50,
+    }
+
+
+class ApkgWriter:
+    """
+    Streams notes into an .apkg file.
+
+    add_card / add_reverse_card take the same arguments as their anki.py
+    namesakes. Referenced media is copied into the package as it is seen:
+    audio and local image filenames are read from ANKI_MEDIA_DIR (or the
+    given path), remote image URLs are downloaded and shrunk like in
+    /create-card. close() (or leaving the `with` block) writes the collection.
+    """
+
+    def __init__(self, path: str, media_dir: str = ANKI_MEDIA_DIR):
+        self.path = path
+        self.media_dir = media_dir
+        self.now = int(time.time())
+        self.model_id = _stable_id('model', ANKI_MODEL_NAME)
+        self.decks = {}
+        self.media = {}  # filename -> zip entry name
+        self._downloaded = {}  # image URL -> filename, so a reverse card reuses the download
+        self.notes = 0
+        self._next_id = int(time.time() * 1000)
+
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        fd, self._db_path = tempfile.mkstemp(suffix='.anki2')
+        os.close(fd)
+        self._db = sqlite3.connect(self._db_path)
+        self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # --- media ---------------------------------------------------------------
+
+    def _add_media_file(self, filename: str, data: Optional[bytes] = None, path: Optional[str] = None):
+        if filename in self.media:
+            return
+        entry = str(len(self.media))
+        if data is not None:
+            self._zip.writestr(entry, data)
+        else:
+            self._zip.write(path, entry)
+        self.media[filename] = entry
+
+    def _local_media(self, src: str) -> Optional[str]:
+        """Add a media file by path or media-dir filename; returns its filename."""
+        for path in (src, os.path.join(self.media_dir, src)):
+            if os.path.isfile(path):
+                filename = os.path.basename(path)
+                self._add_media_file(filename, path=path)
+                return filename
+        return None
+
+    def _package_images(self, image_urls: list) -> list[str]:
+        srcs = []
+        for src in image_urls or []:
+            if src.startswith(('http://', 'https://')):
+                if src not in self._downloaded:
+                    image = fetch_image(src)
+                    if image:
+                        self._add_media_file(*image)
+                    self._downloaded[src] = image[0] if image else src
+                src = self._downloaded[src]
+            else:
+                src = self._local_media(src) or src
+            if src not in srcs:
+                srcs.append(src)
+        return srcs
+
+    def _package_audio(self, audio_path: Optional[str]) -> Optional[str]:
+        if not audio_path:
+            return None
+        if self._local_media(audio_path) is None:
+            print(f'Audio file not found, card will have no sound: {audio_path}')
+            return None
+        return audio_path
+
+    # --- notes ---------------------------------------------------------------
+
+    def _deck_id(self, name: str) -> int:
+        deck_id = self.decks.get(name)
+        if deck_id is None:
+            deck_id = self.decks[name] = _stable_id('deck', name)
+        return deck_id
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def add_note(self, note: dict, word: str, card: str) -> int:
+        """Write one note (as built by anki.build_*_note) and its card. Returns the note id."""
+        fields = [note['fields']['Front'], note['fields']['Back']]
+        note_id = self._new_id()
+        self._db.execute(
+            'INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (note_id, note_guid(word, card), self.model_id, self.now, -1,
+             ' ' + ' '.join(note['tags']) + ' ', FIELD_SEPARATOR.join(fields),
+             _TAG.sub('', fields[0]), _field_checksum(fields[0]), 0, '')
+        )
+        self.notes += 1
+        self._db.execute(
+            'INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (self._new_id(), note_id, self._deck_id(note['deckName']), 0, self.now, -1,
+             0, 0, self.notes, 0, 0, 0, 0, 0, 0, 0, 0, '')
+        )
+        if self.notes % 500 == 0:
+            self._db.commit()
+        return note_id
+
+    def add_card(
+        self,
+        word: str,
+        article: Optional[str],
+        definitions: list,
+        word_classes: list,
+        audio_path: Optional[str],
+        image_urls: list,
+        deck: str = ANKI_DECK_NAME,
+    ) -> int:
+        """Export a forward card (see anki.build_card_note)."""
+        note = build_card_note(
+            word, article, definitions, word_classes,
+            self._package_audio(audio_path), self._package_images(image_urls), deck,
+        )
+        return self.add_note(note, word, 'forward')
+
+    def add_reverse_card(
+        self,
+        word: str,
+        article: Optional[str],
+        definitions: list,
+        phonetic: Optional[str],
+        audio_path: Optional[str],
+        image_urls: list,
+        deck: str = ANKI_DECK_NAME,
+    ) -> int:
+        """Export a reverse card (see anki.build_reverse_card_note)."""
+        note = build_reverse_card_note(
+            word, article, definitions, phonetic,
+            self._package_audio(audio_path), self._package_images(image_urls), deck,
+        )
+        return self.add_note(note, word, 'reverse')
+
+    # --- finish --------------------------------------------------------------
+
+    def close(self):
+        """Write the collection metadata and media map, and finish the zip."""
+        decks = {'1': _deck(1, 'Default', self.now)}
+        for name, deck_id in self.decks.items():
+            decks[str(deck_id)] = _deck(deck_id, name, self.now)
+        conf = {
+            'activeDecks': [1], 'curDeck': 1, 'newSpread': 0, 'collapseTime': 1200,
+            'timeLim': 0, 'estTimes': True, 'dueCounts': True, 'curModel': None,
+            'nextPos': self.notes + 1, 'sortType': 'noteFld', 'sortBackwards': False, 'addToCur': True,
+        }
+
+        self._db.execute(
+            'INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, ?)',
+            (self.now, self.now * 1000, self.now * 1000, json.dumps(conf),
+             json.dumps({str(self.model_id): _basic_model(self.model_id, ANKI_MODEL_NAME, self.now)}),
+             json.dumps(decks), json.dumps({'1': DEFAULT_DECK_CONFIG}), '{}')
+        )
+        self._db.commit()
+        self._db.close()
+
+        self._zip.write(self._db_path, 'collection.anki2')
+        self._zip.writestr('media', json.dumps({entry: name for name, entry in self.media.items()}))
+        self._zip.close()
+        os.remove(self._db_path)
+
+    def abort(self):
+        """Discard a partial export."""
+        self._db.close()
+        self._zip.close()
+        os.remove(self._db_path)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def export_cards(cards, path: str, generate: bool = False) -> int:
+    """
+    Write an iterable of /create-card style card dicts to an .apkg.
+    With `generate`, missing Swedish definitions are generated with Claude
+    first. Returns the number of notes written.
+    """
+    if generate:
+        from translation import generate_definitions
+
+    with ApkgWriter(path) as writer:
+        for data in cards:
+            definitions = data['definitions']
+
+            missing = [i for i, d in enumerate(definitions) if not d.get('definition')]
+            if generate and missing:
+                generated = generate_definitions(data['word'], [definitions[i] for i in missing])
+                for i, definition in zip(missing, generated):
+                    definitions[i]['definition'] = definition
+
+            word_classes = list(set(d.get('class', '') for d in definitions if d.get('class')))
+            deck = data.get('deck', ANKI_DECK_NAME)
+
+            writer.add_card(
+                word=data['word'],
+                article=data.get('article'),
+                definitions=definitions,
+                word_classes=word_classes,
+                audio_path=data.get('audio_path'),
+                image_urls=data.get('image_urls', []),
+                deck=deck,
+            )
+            if data.get('create_reverse'):
+                writer.add_reverse_card(
+                    word=data['word'],
+                    article=data.get('article'),
+                    definitions=definitions,
+                    phonetic=definitions[0].get('phonetic') if definitions else None,
+                    audio_path=data.get('audio_path'),
+                    image_urls=data.get('image_urls', []),
+                    deck=deck,
+                )
+        return writer.notes
+
+
+def _read_cards(path: str):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export cards to an Anki .apkg without AnkiConnect')
+    parser.add_argument('cards', help='JSONL file, one /create-card style card per line')
+    parser.add_argument('out', help='path of the .apkg to write')
+    parser.add_argument('--generate', action='store_true', help='generate missing definitions with Claude')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    notes = export_cards(_read_cards(args.cards), args.out, generate=args.generate)
+    print(f'Wrote {notes} notes to {args.out} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,84 @@
-from flask import Flask, jsonify, request
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
+
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
 
-from lexicon import word_data, inflection_map, lookup_word
-from translation import improve_translation, get_translation, generate_definition
+from config import (
+    LEXICON_READY_TIMEOUT, CREATE_CARD_DEADLINE, CLAUDE_MAX_CONCURRENCY,
+    PREFETCH_ENABLED, PREFETCH_MAX_WORKERS, PREFETCH_TTL_SECONDS, PREFETCH_MAX_WORDS,
+)
+from lexicon import Lexicon, tokenize_text
+from translation import (
+    improve_translation, improve_translations, get_translation,
+    generate_definitions, apply_cached_answers, cached_improved_senses,
+)
 from audio import get_forvo_audio
 from images import get_images
-from anki import add_card, add_reverse_card, get_decks, is_anki_running
+from apkg import export_cards
+from anki import build_card_note, build_reverse_card_note, add_notes, get_decks, is_anki_running, health as anki_health
+from http_client import latency_stats
+from media import prepare_images
+from note_index import NoteIndex
+from outbox import Outbox
+from prefetch import Prefetcher
 
 app = Flask(__name__)
 CORS(app)  # allow Electron frontend to call the API
 
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+# parsed on a background thread so /health answers while the lexicon loads;
+# cached Claude improvements and definitions are layered on as entries are read
+lexicon = Lexicon(enrich=apply_cached_answers, enriched_senses=cached_improved_senses)
+lexicon.start()
+
+# runs the Anki check alongside definition generation in /create-card
+executor = ThreadPoolExecutor(max_workers=CLAUDE_MAX_CONCURRENCY, thread_name_prefix='create-card')
+
+# number of images the UI asks /images for after a lookup
+DEFAULT_IMAGE_COUNT = 5
+
+# /lookup starts these for the resolved word, and /audio and /images attach to them
+prefetcher = Prefetcher(
+    fetchers={
+        'audio': get_forvo_audio,
+        'images': lambda word: get_images(word=word, num=DEFAULT_IMAGE_COUNT),
+    },
+    max_workers=PREFETCH_MAX_WORKERS,
+    ttl_seconds=PREFETCH_TTL_SECONDS,
+    max_words=PREFETCH_MAX_WORDS,
+)
+
+# notes already in Anki, synced in the background so lookups can flag
+# words that are in a deck without asking AnkiConnect
+note_index = NoteIndex()
+note_index.start()
+
+
+def _lexicon_unavailable(indexed: bool = False):
+    """
+    Wait (bounded) for the lexicon — and with `indexed`, its search indexes —
+    to finish loading. Returns an error response if it is still loading or
+    failed, else None.
+    """
+    wait = lexicon.wait_until_indexed if indexed else lexicon.wait_until_ready
+    if not wait(timeout=LEXICON_READY_TIMEOUT):
+        response = jsonify({'error': 'Lexicon is still loading', **lexicon.progress()})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    if not lexicon.ready:
+        return jsonify({'error': f'Lexicon failed to load: {lexicon.error}'}), 500
+
+    return None
+
 
 # ---------------------------------------------------------------------------
 # Health check
@@ -17,14 +86,22 @@ CORS(app)  # allow Electron frontend to call the API
 
 @app.route('/health')
 def health():
+    # answered from the cached Anki state, so polling it never waits on AnkiConnect
     return jsonify({
         'status': 'ok',
-        'words_loaded': len(word_data),
-        'inflections_loaded': len(inflection_map),
+        **lexicon.progress(),
         'anki_running': is_anki_running(),
+        'anki_circuit': 'open' if anki_health.circuit_open else 'closed',
+        'outbox': outbox.counts(),
     })
 
 
+@app.route('/stats/http')
+def http_stats():
+    """Per-host latency histograms for outbound calls (Forvo, Wikimedia, Serper, AnkiConnect)."""
+    return jsonify(latency_stats())
+
+
 # ---------------------------------------------------------------------------
 # Word lookup
 # ---------------------------------------------------------------------------
@@ -34,17 +111,160 @@ def lookup(word):
     """
     Look up a word by its base form or any inflected form.
     Returns the base word and all its definitions.
+    Unknown compounds fall back to their head word's details, with the split
+    under a 'compound' key. 'in_deck' / 'in_decks' say whether Anki already
+    has a note for the word (from the local note index, not AnkiConnect).
     """
-    result = lookup_word(
-        word=word.lower().strip(),
-        word_data=word_data,
-        inflection_map=inflection_map
-    )
+    unavailable = _lexicon_unavailable()
+    if unavailable:
+        return unavailable
+
+    word = word.lower().strip()
+    result = lexicon.lookup(word, index_timeout=LEXICON_READY_TIMEOUT)
 
     if not result:
         return jsonify({'error': f'"{word}" not found'}), 404
 
-    return jsonify(result)
+    base_word, details = next(iter(result.items()))
+
+    # the UI asks for audio and images of the base word next; start them now
+    if PREFETCH_ENABLED:
+        prefetcher.prefetch(base_word)
+
+    return jsonify({base_word: {**details, **note_index.lookup(base_word)}})
+
+
+@app.route('/lookup/batch', methods=['POST'])
+def lookup_batch():
+    """
+    Look up many words in one request.
+    Expects JSON with either "words" (a list) or "text" (raw Swedish text,
+    tokenized here). Optional "stream": true returns NDJSON — a summary line
+    followed by one line per base word — for large inputs.
+
+    Tokens are lemmatized through the inflection map (and compound splitter),
+    deduplicated by base word and counted. Words are ordered by frequency.
+    """
+    data = request.get_json() or {}
+
+    if isinstance(data.get('words'), list):
+        tokens = [w.lower().strip() for w in data['words'] if isinstance(w, str) and w.strip()]
+    elif isinstance(data.get('text'), str):
+        tokens = tokenize_text(data['text'])
+    else:
+        return jsonify({'error': 'Expected "words" (list) or "text" (string)'}), 400
+
+    unavailable = _lexicon_unavailable()
+    if unavailable:
+        return unavailable
+
+    # base word -> {'count', 'forms', 'compound'}; Counter keeps first-seen order
+    found = {}
+    unknown = []
+    for token, count in Counter(tokens).items():
+        resolved = lexicon.resolve(token, index_timeout=LEXICON_READY_TIMEOUT)
+        if not resolved:
+            unknown.append({'token': token, 'count': count})
+            continue
+
+        base_word, compound = resolved
+        entry = found.setdefault(base_word, {'count': 0, 'forms': {}, 'compound': None})
+        entry['count'] += count
+        entry['forms'][token] = count
+        if compound and not entry['compound']:
+            entry['compound'] = compound
+
+    ranked = sorted(found.items(), key=lambda item: -item[1]['count'])
+    summary = {
+        'tokens': len(tokens),
+        'words_found': len(found),
+        'unknown': sorted(unknown, key=lambda u: -u['count']),
+    }
+
+    def word_entry(base_word: str, entry: dict) -> dict:
+        details = {**lexicon.details(base_word), **note_index.lookup(base_word)}
+        if entry['compound']:
+            details['compound'] = entry['compound']
+        return {
+            'word': base_word,
+            'count': entry['count'],
+            'forms': entry['forms'],
+            'details': details,
+        }
+
+    if data.get('stream'):
+        def generate():
+            yield json.dumps({'summary': summary}, ensure_ascii=False) + '\n'
+            for base_word, entry in ranked:
+                yield json.dumps(word_entry(base_word, entry), ensure_ascii=False) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    return jsonify({**summary, 'words': [word_entry(w, e) for w, e in ranked]})
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+# upper bound on ?limit for the search endpoints
+MAX_SEARCH_RESULTS = 100
+
+
+@app.route('/search')
+def search():
+    """
+    Prefix and typo-tolerant search over all base forms and inflections.
+    Query params: q (required), limit (default 10, at most MAX_SEARCH_RESULTS).
+    Each result has the matched form, its base word, match type and edit distance.
+    """
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_SEARCH_RESULTS))
+
+    if not query:
+        return jsonify({'error': 'Missing query parameter "q"'}), 400
+
+    unavailable = _lexicon_unavailable(indexed=True)
+    if unavailable:
+        return unavailable
+
+    if lexicon.search_index is None:
+        return jsonify({'error': 'Search index is unavailable'}), 500
+
+    return jsonify({'query': query, 'results': lexicon.search_index.search(query, limit=limit)})
+
+
+@app.route('/reverse-lookup/<english>')
+def reverse_lookup(english):
+    """
+    Find Swedish words whose (improved) translation matches an English phrase.
+    Query params: limit (default 10, at most MAX_SEARCH_RESULTS).
+    Returns ranked matches with the matching definition.
+    """
+    limit = max(1, min(request.args.get('limit', 10, type=int), MAX_SEARCH_RESULTS))
+
+    unavailable = _lexicon_unavailable(indexed=True)
+    if unavailable:
+        return unavailable
+
+    if lexicon.reverse_index is None:
+        return jsonify({'error': 'Reverse index is unavailable'}), 500
+
+    results = []
+    for word, definition_index, score in lexicon.reverse_index.lookup(english, limit=limit):
+        details = lexicon.details(word)
+        results.append({
+            'word': word,
+            'word with article': details['word with article'],
+            'definition_index': definition_index,
+            'definition': details['definitions'][definition_index],
+            'score': score,
+        })
+
+    if not results:
+        return jsonify({'error': f'No Swedish word found for "{english}"'}), 404
+
+    return jsonify({'query': english, 'results': results})
 
 
 # ---------------------------------------------------------------------------
@@ -56,29 +276,56 @@ def improve():
     """
     Improve the Folkets translation for a specific definition using Claude.
     Expects JSON: { "word": "sträckning", "definition_index": 0 }
-    Updates word_data in place and returns the improved definition.
+    Returns the improved definition; the answer is cached, so later lookups
+    include it too.
+
+    To improve several senses with a single Claude call, send
+    "definition_indices": [0, 2] (or "all") instead; the response is then
+    { "definitions": [...] } with every definition of the word.
     """
+    unavailable = _lexicon_unavailable()
+    if unavailable:
+        return unavailable
+
     data = request.get_json()
     word = data.get('word')
-    definition_index = data.get('definition_index', 0)
+    definition_indices = data.get('definition_indices')
+    word_data = lexicon.word_data
 
     if word not in word_data:
         return jsonify({'error': f'"{word}" not found'}), 404
 
-    definitions = word_data[word]['definitions']
+    # improve copies of the stored senses: answers are keyed by the stored
+    # fields and reach later lookups from the LLM cache via the enrich hook
+    definitions = [dict(d) for d in word_data[word]['definitions']]
 
-    if definition_index >= len(definitions):
-        return jsonify({'error': 'definition_index out of range'}), 400
+    if definition_indices is None:
+        definition_index = data.get('definition_index', 0)
+        if definition_index >= len(definitions):
+            return jsonify({'error': 'definition_index out of range'}), 400
 
-    updated = improve_translation(
-        word=word,
-        definition_entry=definitions[definition_index]
-    )
+        improve_translation(word=word, definition_entry=definitions[definition_index])
+        indices = [definition_index]
+    else:
+        if definition_indices == 'all':
+            definition_indices = list(range(len(definitions)))
+        if (not isinstance(definition_indices, list)
+                or not all(isinstance(i, int) and 0 <= i < len(definitions) for i in definition_indices)):
+            return jsonify({'error': 'definition_indices out of range'}), 400
+
+        indices = sorted(set(definition_indices))
+        improve_translations(word, [definitions[i] for i in indices])
 
-    # update in place so subsequent lookups return the improved translation
-    word_data[word]['definitions'][definition_index] = updated
+    # fill in the other cached answers (e.g. definitions), as /lookup would
+    definitions = apply_cached_answers(word, {'definitions': definitions})['definitions']
 
-    return jsonify(updated)
+    if lexicon.reverse_index is not None:
+        for i in indices:
+            lexicon.reverse_index.update(word, i, definitions[i])
+
+    if definition_indices is None:
+        return jsonify(definitions[indices[0]])
+    return jsonify({'definitions': definitions})
 
 
 # ---------------------------------------------------------------------------
@@ -91,7 +338,7 @@ def audio(word):
     Download the Forvo pronunciation for a word and save it to Anki media dir.
     Returns the file path.
     """
-    path = get_forvo_audio(word)
+    path = prefetcher.get('audio', word)
 
     if not path:
         return jsonify({'error': f'No audio found for "{word}"'}), 404
@@ -106,10 +353,17 @@ def audio(word):
 @app.route('/images/<word>')
 def images(word):
     """
-    Return up to 5 image URLs for a word (Wikimedia first, then Serper).
+    Return up to `num` (default 5) image URLs for a word. Wikimedia and
+    Serper are queried concurrently; Wikimedia results rank first and Serper
+    tops up the rest. Results are cached on disk per word, locale and count
+    (not when a provider failed), and the default count attaches to the
+    /lookup prefetch.
     """
-    num = request.args.get('num', 5, type=int)
-    urls = get_images(word=word, num=num)
+    num = request.args.get('num', DEFAULT_IMAGE_COUNT, type=int)
+    if num == DEFAULT_IMAGE_COUNT:
+        urls = prefetcher.get('images', word)
+    else:
+        urls = get_images(word=word, num=num)
 
     if not urls:
         return jsonify({'error': f'No images found for "{word}"'}), 404
@@ -121,77 +375,362 @@ def images(word):
 # Anki card creation
 # ---------------------------------------------------------------------------
 
-@app.route('/create-card', methods=['POST'])
-def create_card():
+def _create_cards(cards: list) -> tuple:
     """
-    Create an Anki card via AnkiConnect.
-    Expects JSON with word details and the user's chosen image URL.
+    Create forward (and, with create_reverse, reverse) notes for many words:
+    missing definitions are generated and chosen images stored concurrently,
+    then every note and media upload goes to Anki in one batched write.
 
-    Required fields: word, word_class, translation, definition
-    Optional fields: article, example, synonyms, phonetic,
-                     audio_path, image_url, deck
+    Returns (results, None) with one result per card —
+      {'word', 'success', 'note_id', 'notes': [{'card': 'forward', 'note_id'}, ...], 'error'?}
+    — or (None, error response) when Anki can't be reached.
     """
-    data = request.get_json()
+    # a bulk request gets one deadline per round of concurrent generations
+    rounds = -(-len(cards) // CLAUDE_MAX_CONCURRENCY)
+    deadline = time.monotonic() + CREATE_CARD_DEADLINE * max(1, rounds)
+
+    # check Anki while missing definitions are generated, so a closed Anki
+    # fails fast instead of after the Claude round trip
+    anki_check = executor.submit(is_anki_running)
+
+    generations = []
+    for data in cards:
+        definitions = data['definitions']
+        missing_senses = [i for i, def_entry in enumerate(definitions) if not def_entry.get('definition')]
+        generation = None
+        if missing_senses:
+            print(f'Generating definitions for "{data["word"]}" senses {[i + 1 for i in missing_senses]}...')
+            generation = executor.submit(
+                generate_definitions, data['word'], [definitions[i] for i in missing_senses]
+            )
+        generations.append((missing_senses, generation))
 
-    required = ['word', 'definitions']
-    missing = [f for f in required if not data.get(f)]
-    if missing:
-        return jsonify({'error': f'Missing fields: {", ".join(missing)}'}), 400
-
-    definitions = data['definitions']
-    if not definitions:
-        return jsonify({'error': 'No definitions provided'}), 400
+    try:
+        anki_running = anki_check.result(timeout=max(0, deadline - time.monotonic()))
+    except FutureTimeout:
+        anki_running = False
+
+    if not anki_running:
+        # a generation already in flight still finishes and lands in the cache
+        for _, generation in generations:
+            if generation is not None:
+                generation.cancel()
+        return None, (jsonify({'error': 'Anki is not running or AnkiConnect is not installed'}), 503)
+
+    # download and shrink the chosen images while definitions are generated
+    image_jobs = [
+        executor.submit(prepare_images, data['image_urls']) if data.get('image_urls') else None
+        for data in cards
+    ]
+
+    results = []
+    notes = []        # (card index, kind, note)
+    media_files = []
+    for index, (data, (missing_senses, generation), image_job) in enumerate(zip(cards, generations, image_jobs)):
+        result = {'word': data['word'], 'success': False, 'notes': []}
+        results.append(result)
+        definitions = data['definitions']
+
+        if generation is not None:
+            try:
+                generated = generation.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeout:
+                result['error'] = 'Timed out generating missing definitions'
+                result['status'] = 504
+                continue
+            except Exception as e:
+                result['error'] = f'Could not generate missing definitions: {e}'
+                result['status'] = 502
+                continue
 
-    # generate definitions for any entries missing them
-    for i, def_entry in enumerate(definitions):
-        if not def_entry.get('definition'):
-            print(f'Generating definition for "{data["word"]}" sense {i+1}...')
-            definitions[i]['definition'] = generate_definition(data['word'], def_entry)
+            for i, definition in zip(missing_senses, generated):
+                definitions[i]['definition'] = definition
 
-    # collect all word classes for tags
-    word_classes = list(set(d.get('class', '') for d in definitions if d.get('class')))
+        image_urls = data.get('image_urls', [])
+        if image_job is not None:
+            try:
+                image_urls, uploads = image_job.result(timeout=max(0, deadline - time.monotonic()))
+                media_files.extend(uploads)
+            except FutureTimeout:
+                print('Timed out storing images locally, using remote URLs')
+            except Exception as e:
+                print(f'Could not store images locally ({e}), using remote URLs')
 
-    if not is_anki_running():
-        return jsonify({'error': 'Anki is not running or AnkiConnect is not installed'}), 503
+        # collect all word classes for tags
+        word_classes = list(set(d.get('class', '') for d in definitions if d.get('class')))
+        deck = data.get('deck', 'Swedish')
 
-    try:
-        note_id = add_card(
+        notes.append((index, 'forward', build_card_note(
             word=data['word'],
             article=data.get('article'),
             definitions=definitions,
             word_classes=word_classes,
             audio_path=data.get('audio_path'),
-            image_urls=data.get('image_urls', []),
-            deck=data.get('deck', 'Swedish'),
-        )
-
-        result = {'success': True, 'note_id': note_id}
+            image_urls=image_urls,
+            deck=deck,
+        )))
 
-        # create reverse card if requested - use all definitions and images
         if data.get('create_reverse'):
-            try:
-                # use first definition's phonetic (they're usually the same across senses)
-                first_phonetic = definitions[0].get('phonetic') if definitions else None
-                reverse_id = add_reverse_card(
-                    word=data['word'],
-                    article=data.get('article'),
-                    definitions=definitions,
-                    phonetic=first_phonetic,
-                    audio_path=data.get('audio_path'),
-                    image_urls=data.get('image_urls', []),
-                    deck=data.get('deck', 'Swedish'),
-                )
-                result['reverse_note_id'] = reverse_id
-            except Exception as e:
-                print(f'Reverse card creation failed: {e}')
-                import traceback
-                traceback.print_exc()
-                # Don't fail the whole request if reverse fails
-                result['reverse_error'] = str(e)
+            # use first definition's phonetic (they're usually the same across senses)
+            notes.append((index, 'reverse', build_reverse_card_note(
+                word=data['word'],
+                article=data.get('article'),
+                definitions=definitions,
+                phonetic=definitions[0].get('phonetic'),
+                audio_path=data.get('audio_path'),
+                image_urls=image_urls,
+                deck=deck,
+            )))
+
+    if notes:
+        try:
+            outcomes = add_notes([note for _, _, note in notes], media_files=media_files)
+        except Exception as e:
+            outcomes = [{'error': str(e)}] * len(notes)
+
+        for (index, kind, _), outcome in zip(notes, outcomes):
+            result = results[index]
+            result['notes'].append({'card': kind, **outcome})
+            if 'note_id' in outcome:
+                note_index.add(result['word'], cards[index].get('deck', 'Swedish'), outcome['note_id'], kind)
+            if kind == 'forward':
+                if 'note_id' in outcome:
+                    result['success'] = True
+                    result['note_id'] = outcome['note_id']
+                else:
+                    result['error'] = outcome['error']
+                    if outcome.get('unreachable'):
+                        # Anki went away after the health check; the card goes to the outbox
+                        result['unreachable'] = True
+            elif 'error' in outcome:
+                print(f'Reverse card creation failed for "{result["word"]}": {outcome["error"]}')
+
+    return results, None
+
+
+# sense fields the card builders read, by expected type
+SENSE_TEXT_FIELDS = ('class', 'translation', 'improved_translation', 'definition', 'example', 'phonetic')
+SENSE_LIST_FIELDS = ('synonyms', 'inflections')
+
+
+def _validate_card(data) -> Optional[str]:
+    if not isinstance(data, dict):
+        return 'Expected a card object'
+    required = ['word', 'definitions']
+    missing = [f for f in required if not data.get(f)]
+    if missing:
+        return f'Missing fields: {", ".join(missing)}'
+    if not isinstance(data['word'], str):
+        return 'word must be a string'
+    if not isinstance(data['definitions'], list):
+        return 'definitions must be a list'
+
+    for i, sense in enumerate(data['definitions']):
+        if not isinstance(sense, dict):
+            return f'definitions[{i}] must be an object'
+        for field in SENSE_TEXT_FIELDS:
+            if sense.get(field) is not None and not isinstance(sense[field], str):
+                return f'definitions[{i}].{field} must be a string'
+        for field in SENSE_LIST_FIELDS:
+            value = sense.get(field)
+            if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+                return f'definitions[{i}].{field} must be a list of strings'
+    return None
+
+
+def _deliver_queued(cards: list) -> Optional[list]:
+    """Outbox delivery: create queued cards, or None while Anki is unreachable."""
+    # check first so no audio or definitions are generated for a closed Anki
+    if not is_anki_running():
+        return None
+    with app.app_context():
+        results, error_response = _create_cards(cards)
+    return None if error_response else results
+
+
+# cards accepted while Anki is closed (or sent with "queue": true) wait here
+# and are written by a background worker once Anki is reachable
+outbox = Outbox()
+outbox.start(_deliver_queued)
+
+
+def _queue_cards(cards: list) -> list[dict]:
+    """Put cards in the outbox, returning a queued result per card."""
+    tickets = outbox.enqueue(cards)
+    return [
+        {'word': card['word'], 'success': True, 'queued': True, 'ticket': ticket}
+        for card, ticket in zip(cards, tickets)
+    ]
+
+
+def _queue_unreachable(cards: list, results: list) -> int:
+    """
+    Queue the cards Anki couldn't be reached for mid-write (the cached health
+    check said it was up), replacing their results. Returns how many.
+    """
+    unreachable = [i for i, result in enumerate(results) if result.get('unreachable')]
+    if unreachable:
+        for i, queued in zip(unreachable, _queue_cards([cards[i] for i in unreachable])):
+            results[i] = queued
+    return len(unreachable)
+
+
+@app.route('/create-card', methods=['POST'])
+def create_card():
+    """
+    Create an Anki card via AnkiConnect.
+    Expects JSON with word details and the user's chosen image URLs.
+
+    Required fields: word, definitions
+    Optional fields: article, audio_path, image_urls, deck, create_reverse, queue
+
+    The forward and reverse notes are written in one batched request; the
+    response lists each note's outcome under 'notes'.
+
+    When Anki isn't reachable — or with "queue": true — the card is kept in
+    the outbox instead and 202 is returned with a ticket for /outbox/<ticket>.
+    """
+    data = request.get_json()
+
+    error = _validate_card(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    if data.get('queue'):
+        return jsonify(_queue_cards([data])[0]), 202
+
+    results, error_response = _create_cards([data])
+    if error_response:
+        # Anki is closed: keep the prepared card and deliver it later
+        return jsonify(_queue_cards([data])[0]), 202
+    if _queue_unreachable([data], results):
+        return jsonify(results[0]), 202
 
-        return jsonify(result)
+    result = results[0]
+    status = result.pop('status', 500)
+    if not result['success']:
+        return jsonify(result), status
+    return jsonify(result)
+
+
+@app.route('/create-cards', methods=['POST'])
+def create_cards():
+    """
+    Create cards for many words at once, for bulk deck building.
+    Expects JSON: { "cards": [ <same fields as /create-card>, ... ] }
+
+    All notes and media go to Anki in batched `multi` requests rather than a
+    round trip per note. Returns { "results": [...] } with one entry per card,
+    in order, each shaped like a /create-card response.
+    Like /create-card, the cards are queued (202) when Anki isn't reachable
+    or the request has "queue": true.
+    """
+    data = request.get_json() or {}
+    cards = data.get('cards')
+    if not isinstance(cards, list) or not cards:
+        return jsonify({'error': 'Expected "cards" (non-empty list)'}), 400
+
+    for i, card in enumerate(cards):
+        error = _validate_card(card)
+        if error:
+            return jsonify({'error': f'Card {i}: {error}'}), 400
+
+    if data.get('queue'):
+        return jsonify({'created': 0, 'queued': len(cards), 'results': _queue_cards(cards)}), 202
+
+    results, error_response = _create_cards(cards)
+    if error_response:
+        # Anki is closed: keep the prepared cards and deliver them later
+        return jsonify({'created': 0, 'queued': len(cards), 'results': _queue_cards(cards)}), 202
+    queued = _queue_unreachable(cards, results)
+
+    for result in results:
+        result.pop('status', None)
+    created = sum(result['success'] and not result.get('queued') for result in results)
+    if queued:
+        return jsonify({'created': created, 'queued': queued, 'results': results}), 202
+    return jsonify({'created': created, 'results': results})
+
+
+@app.route('/export-apkg', methods=['POST'])
+def export_apkg():
+    """
+    Export cards to a downloadable .apkg instead of adding them through
+    AnkiConnect — works without Anki open.
+    Expects JSON: { "cards": [ <same fields as /create-card>, ... ],
+                    "generate": true (optional, fill missing definitions),
+                    "filename": "Swedish.apkg" (optional) }
+    """
+    data = request.get_json() or {}
+    cards = data.get('cards')
+    if not isinstance(cards, list) or not cards:
+        return jsonify({'error': 'Expected "cards" (non-empty list)'}), 400
+
+    for i, card in enumerate(cards):
+        error = _validate_card(card)
+        if error:
+            return jsonify({'error': f'Card {i}: {error}'}), 400
+
+    fd, path = tempfile.mkstemp(suffix='.apkg')
+    os.close(fd)
+    try:
+        export_cards(cards, path, generate=bool(data.get('generate')))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        if os.path.exists(path):
+            os.remove(path)
+        return jsonify({'error': f'Export failed: {e}'}), 500
+
+    response = send_file(
+        path,
+        mimetype='application/octet-stream',
+        as_attachment=True,
+        download_name=data.get('filename') or 'Swedish.apkg',
+    )
+    response.call_on_close(lambda: os.remove(path))
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Outbox
+# ---------------------------------------------------------------------------
+
+# upper bound on ?limit for /outbox; SQLite treats a negative LIMIT as none
+MAX_OUTBOX_ITEMS = 1000
+
+
+@app.route('/outbox')
+def outbox_items():
+    """
+    Queued cards: counts per status plus the pending and failed items
+    (?status=pending|failed|done to pick one).
+    """
+    status = request.args.get('status')
+    if status not in (None, 'pending', 'failed', 'done'):
+        return jsonify({'error': f'Unknown status "{status}"'}), 400
+    limit = max(1, min(request.args.get('limit', 100, type=int), MAX_OUTBOX_ITEMS))
+    return jsonify({'counts': outbox.counts(), 'items': outbox.items(status, limit=limit)})
+
+
+@app.route('/outbox/<ticket>', methods=['GET', 'DELETE'])
+def outbox_ticket(ticket):
+    """Status of one queued card (GET), or drop it before delivery (DELETE)."""
+    if request.method == 'DELETE':
+        if not outbox.remove(ticket):
+            return jsonify({'error': f'No pending or failed card "{ticket}"'}), 404
+        return jsonify({'ticket': ticket, 'removed': True})
+
+    item = outbox.get(ticket)
+    if not item:
+        return jsonify({'error': f'Unknown ticket "{ticket}"'}), 404
+    return jsonify(item)
+
+
+@app.route('/outbox/<ticket>/retry', methods=['POST'])
+def outbox_retry(ticket):
+    """Queue a failed card again."""
+    if not outbox.retry(ticket):
+        return jsonify({'error': f'No failed card "{ticket}"'}), 404
+    return jsonify(outbox.get(ticket))
 
 
 # ---------------------------------------------------------------------------
@@ -200,10 +739,114 @@ def create_card():
 
 @app.route('/decks')
 def decks():
-    """Return all Anki deck names so the frontend can let the user pick one."""
+    """
+    Return all Anki deck names so the frontend can let the user pick one.
+    The list is cached; ?refresh=1 reads it from Anki again.
+    """
     if not is_anki_running():
         return jsonify({'error': 'Anki is not running'}), 503
-    return jsonify({'decks': get_decks()})
+    return jsonify({'decks': get_decks(refresh=request.args.get('refresh') in ('1', 'true'))})
+
+
+# ---------------------------------------------------------------------------
+# Card draft
+# ---------------------------------------------------------------------------
+
+# fans out the providers of a /prepare request; separate from `executor` so a
+# draft never waits behind card creation
+prepare_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='prepare')
+
+
+@app.route('/prepare/<word>')
+def prepare(word):
+    """
+    Everything needed to draft a card in one round trip.
+    Resolves the word like /lookup, then fetches images, audio, the deck list
+    and (with ?generate=1) missing Swedish definitions concurrently.
+
+    Streams NDJSON, one event per line as each part completes — or
+    Server-Sent Events when the client accepts text/event-stream:
+      {"event": "lookup", "word": "hund", "details": {...}}
+      {"event": "images", "images": [...]}
+      {"event": "audio", "path": "...", "filename": "hund.mp3"}
+      {"event": "decks", "decks": [...]}
+      {"event": "definitions", "generated": {"0": "..."}}
+      {"event": "done", "duration_ms": 812}
+    A part that fails is sent with an "error" key instead.
+    """
+    start = time.perf_counter()
+
+    unavailable = _lexicon_unavailable()
+    if unavailable:
+        return unavailable
+
+    result = lexicon.lookup(word.lower().strip(), index_timeout=LEXICON_READY_TIMEOUT)
+    if not result:
+        return jsonify({'error': f'"{word}" not found'}), 404
+
+    base_word, details = next(iter(result.items()))
+    num = request.args.get('num', DEFAULT_IMAGE_COUNT, type=int)
+    generate = request.args.get('generate') in ('1', 'true')
+    sse = request.accept_mimetypes.best == 'text/event-stream'
+
+    if PREFETCH_ENABLED:
+        prefetcher.prefetch(base_word)
+
+    def fetch_images():
+        if num == DEFAULT_IMAGE_COUNT:
+            urls = prefetcher.get('images', base_word)
+        else:
+            urls = get_images(word=base_word, num=num)
+        return {'images': urls} if urls else {'error': f'No images found for "{base_word}"'}
+
+    def fetch_audio():
+        path = prefetcher.get('audio', base_word)
+        if not path:
+            return {'error': f'No audio found for "{base_word}"'}
+        return {'path': path, 'filename': path.split('/')[-1]}
+
+    def fetch_decks():
+        if not is_anki_running():
+            return {'error': 'Anki is not running'}
+        return {'decks': get_decks()}
+
+    def fetch_definitions():
+        missing = [i for i, d in enumerate(details['definitions']) if not d.get('definition')]
+        if not missing:
+            return {'generated': {}}
+
+        # cached by generate_definitions; later lookups get them via the enrich hook
+        generated = generate_definitions(base_word, [details['definitions'][i] for i in missing])
+        return {'generated': dict(zip(missing, generated))}
+
+    def encode(event: dict) -> str:
+        line = json.dumps(event, ensure_ascii=False)
+        return f'event: {event["event"]}\ndata: {line}\n\n' if sse else line + '\n'
+
+    lookup_event = encode({'event': 'lookup', 'word': base_word,
+                           'details': {**details, **note_index.lookup(base_word)}})
+
+    parts = {'images': fetch_images, 'audio': fetch_audio, 'decks': fetch_decks}
+    if generate:
+        parts['definitions'] = fetch_definitions
+    futures = {prepare_executor.submit(fetch): name for name, fetch in parts.items()}
+
+    def generate_events():
+        yield lookup_event
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                payload = future.result()
+            except Exception as e:
+                payload = {'error': str(e)}
+            yield encode({'event': name, **payload})
+        yield encode({'event': 'done', 'duration_ms': round((time.perf_counter() - start) * 1000)})
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -1,7 +1,100 @@
 import os
-import requests
+import sqlite3
+import threading
+import time
 from typing import Optional
-from config import FORVO_API_KEY, ANKI_MEDIA_DIR
+
+import http_client
+from config import FORVO_API_KEY, ANKI_MEDIA_DIR, AUDIO_INDEX_PATH, AUDIO_NEGATIVE_TTL_HOURS
+
+INDEX_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS audio_index (
+    word        TEXT PRIMARY KEY,
+    filename    TEXT,           -- NULL when Forvo has no pronunciation
+    speaker     TEXT,
+    votes       INTEGER,
+    fetched_at  REAL NOT NULL
+);
+'''
+
+
+class AudioIndex:
+    """
+    Metadata index of downloaded pronunciations: word -> file, speaker, votes,
+    fetched_at. Stores bare filenames resolved against the current media dir,
+    so the cache survives the Anki media directory moving. Rows without a
+    filename are negative entries: Forvo had nothing for the word.
+    """
+
+    def __init__(self, path: str, negative_ttl_hours: float):
+        self.path = path
+        self.negative_ttl_seconds = negative_ttl_hours * 3600
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(INDEX_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, word: str) -> Optional[dict]:
+        """Return the index row for a word, or None. Expired negative rows count as missing."""
+        try:
+            row = self._connect().execute(
+                'SELECT filename, speaker, votes, fetched_at FROM audio_index WHERE word = ?', (word,)
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            print(f'Audio index read failed: {e}')
+            return None
+
+        if not row:
+            return None
+        filename, speaker, votes, fetched_at = row
+        if filename is None and time.time() - fetched_at > self.negative_ttl_seconds:
+            return None
+        return {'filename': filename, 'speaker': speaker, 'votes': votes, 'fetched_at': fetched_at}
+
+    def put(self, word: str, filename: Optional[str], speaker: Optional[str] = None, votes: Optional[int] = None):
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO audio_index (word, filename, speaker, votes, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (word, filename, speaker, votes, time.time())
+                )
+        except (sqlite3.Error, OSError) as e:
+            print(f'Audio index write failed: {e}')
+
+
+index = AudioIndex(AUDIO_INDEX_PATH, negative_ttl_hours=AUDIO_NEGATIVE_TTL_HOURS)
+
+
+def _cached_audio(word: str) -> tuple[bool, Optional[str]]:
+    """
+    Answer from local state only. Returns (hit, path): (True, path) for a
+    file on disk, (True, None) for a live negative entry, (False, None) when
+    Forvo has to be asked.
+    """
+    entry = index.get(word)
+    if entry is not None:
+        if entry['filename'] is None:
+            return True, None
+        filepath = os.path.abspath(os.path.join(ANKI_MEDIA_DIR, entry['filename']))
+        if os.path.exists(filepath):
+            return True, filepath
+
+    # files saved before the index existed, or copied in by hand
+    filepath = os.path.abspath(os.path.join(ANKI_MEDIA_DIR, f'{word}.mp3'))
+    if os.path.exists(filepath):
+        index.put(word, os.path.basename(filepath))
+        return True, filepath
+
+    return False, None
 
 
 def get_forvo_audio(word: str) -> Optional[str]:
@@ -10,8 +103,20 @@ def get_forvo_audio(word: str) -> Optional[str]:
     directly to the Anki media directory.
     Returns the file path, or None if no pronunciation was found.
 
+    The media directory and the audio index are checked first, so cached
+    words and words Forvo is known to lack (until AUDIO_NEGATIVE_TTL_HOURS)
+    never touch the network.
+
     Note: Forvo audio URLs expire after 2 hours — always download immediately.
     """
+    hit, cached_path = _cached_audio(word)
+    if hit:
+        if cached_path:
+            print(f'Audio already cached: {cached_path}')
+        else:
+            print(f'No Forvo pronunciation for "{word}" (cached)')
+        return cached_path
+
     url = (
         f'https://apifree.forvo.com/key/{FORVO_API_KEY}'
         f'/format/json/action/word-pronunciations'
@@ -19,7 +124,7 @@ def get_forvo_audio(word: str) -> Optional[str]:
     )
 
     try:
-        response = requests.get(url, timeout=10)
+        response = http_client.get(url)
         response.raise_for_status()
         data = response.json()
     except Exception as e:
@@ -29,16 +134,18 @@ def get_forvo_audio(word: str) -> Optional[str]:
     items = data.get('items', [])
     if not items:
         print(f'No Forvo pronunciation found for "{word}"')
+        index.put(word, None)
         return None
 
     # items are sorted by vote count — first is best
     best = items[0]
     mp3_url = best.get('pathmp3')
     if not mp3_url:
+        index.put(word, None)
         return None
 
     try:
-        audio_response = requests.get(mp3_url, timeout=10)
+        audio_response = http_client.get(mp3_url)
         audio_response.raise_for_status()
     except Exception as e:
         print(f'Failed to download audio for "{word}": {e}')
@@ -47,12 +154,13 @@ def get_forvo_audio(word: str) -> Optional[str]:
     os.makedirs(ANKI_MEDIA_DIR, exist_ok=True)
     filepath = os.path.abspath(os.path.join(ANKI_MEDIA_DIR, f'{word}.mp3'))
 
-    if os.path.exists(filepath):
-        print(f'Audio already cached: {filepath}')
-        return filepath
-
-    with open(filepath, 'wb') as f:
+    # write to a temp file first so a concurrent reader never sees a partial mp3
+    tmp_path = f'{filepath}.part'
+    with open(tmp_path, 'wb') as f:
         f.write(audio_response.content)
+    os.replace(tmp_path, filepath)
+
+    index.put(word, os.path.basename(filepath), speaker=best.get('username'), votes=best.get('num_votes'))
 
     print(f'Audio saved: {filepath}')
     return filepath
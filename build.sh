@@ -3,6 +3,9 @@ set -e
 
 cd "$(dirname "$0")"
 
+echo "==> Prebuilding lexicon snapshot..."
+python3 lexicon.py build-snapshot
+
 echo "==> Building Flask server with PyInstaller..."
 python3 -m PyInstaller flask-server.spec --distpath flask-dist --noconfirm
 
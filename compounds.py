@@ -0,0 +1,127 @@
+from typing import Optional
+
+# parts shorter than this produce too many accidental splits
+MIN_PART_LENGTH = 3
+
+# fogemorfem between compound parts, e.g. riksdag|s|man, barn|e|dom
+LINKING_LETTERS = ('', 's', 'e')
+
+# final vowels dropped from a modifier, e.g. skola -> skol|bok, flicka -> flick|vän
+DROPPED_VOWELS = ('a', 'e')
+
+
+def _add_modifier(modifiers: dict, form: str, base: str):
+    if len(form) >= MIN_PART_LENGTH and form not in modifiers:
+        modifiers[form] = base
+
+
+class CompoundSplitter:
+    """
+    Splits unknown Swedish compounds into known lexicon parts.
+
+    Every part but the last (modifiers) must be a base word, a base word with
+    its final -a/-e dropped, or a first part seen in a known compound's
+    delineation (riks|dag -> 'riks'). Modifiers may be followed by a linking
+    -s- or -e-. The last part (head) can be any base word or inflected form,
+    resolved through inflection_map.
+
+    Modifier forms are stored as a trie whose edges live in one dict keyed
+    by node and letter (packed into an int), so scanning from a position
+    costs one lookup per letter, without slicing, and stops as soon as no
+    known form continues. The split is a right-to-left
+    dynamic program preferring the fewest parts: the modifier scans take
+    O(n * longest form), plus one hashed lookup of each suffix as a head,
+    which is O(n^2) letters for an n-letter word.
+    """
+
+    def __init__(self, word_data, inflection_map: dict):
+        self._word_data = word_data
+        self._inflection_map = inflection_map
+
+        # modifier form -> base word, only needed to build the trie
+        modifiers = {}
+        for word, details in word_data.items():
+            _add_modifier(modifiers, word, word)
+            if word[-1:] in DROPPED_VOWELS:
+                _add_modifier(modifiers, word[:-1], word)
+            for definition in details['definitions']:
+                delineation = definition.get('compound_delineation')
+                if delineation:
+                    for part in delineation.split('|')[:-1]:
+                        _add_modifier(modifiers, part, part)
+
+        # trie over modifier forms; node 0 is the root, letters are < 2**21 code points
+        self._edges = {}
+        self._terminals = {}   # node -> base word of the form ending there
+        for form, base in modifiers.items():
+            node = 0
+            for letter in form:
+                key = node << 21 | ord(letter)
+                child = self._edges.get(key)
+                if child is None:
+                    child = self._edges[key] = len(self._edges) + 1
+                node = child
+            self._terminals[node] = base
+
+    def _head_base(self, form: str) -> Optional[str]:
+        if len(form) < MIN_PART_LENGTH:
+            return None
+        if form in self._word_data:
+            return form
+        return self._inflection_map.get(form)
+
+    def decompose(self, word: str) -> Optional[dict]:
+        """
+        Return the best split of `word` into known parts, or None.
+
+        {
+          'word': 'riksdagsman',
+          'delineation': 'riksdags|man',
+          'parts': [
+            {'form': 'riksdag', 'base': 'riksdag', 'link': 's'},
+            {'form': 'man', 'base': 'man', 'link': ''},
+          ],
+          'head': 'man',
+        }
+        """
+        n = len(word)
+        # best[i] = fewest-part split of word[i:] as a list of (form, base, link)
+        best = [None] * (n + 1)
+
+        for i in range(n - MIN_PART_LENGTH, -1, -1):
+            candidate = None
+
+            head = self._head_base(word[i:])
+            if head:
+                candidate = [(word[i:], head, '')]
+
+            node = 0
+            for j in range(i + 1, n + 1):
+                node = self._edges.get(node << 21 | ord(word[j - 1]))
+                if node is None:
+                    break
+                base = self._terminals.get(node)
+                if base is None:
+                    continue
+                form = word[i:j]
+                for link in LINKING_LETTERS:
+                    k = j + len(link)
+                    if word[j:k] != link or k > n or best[k] is None:
+                        continue
+                    split = [(form, base, link)] + best[k]
+                    if candidate is None or len(split) < len(candidate):
+                        candidate = split
+
+            best[i] = candidate
+
+        # a lone head at position 0 would just be an exact hit, so require 2+ parts
+        split = best[0]
+        if not split or len(split) < 2:
+            return None
+
+        return {
+            'word': word,
+            'delineation': '|'.join(form + link for form, _, link in split),
+            'parts': [{'form': form, 'base': base, 'link': link} for form, base, link in split],
+            'head': split[-1][1],
+        }
@@ -19,16 +19,74 @@ SERPER_DEV_API_KEY = os.getenv('SERPER_DEV_API_KEY')
 # --- Data Paths ---
 FOLKETS_XML_PATH = os.getenv('FOLKETS_XML_PATH', _resource('data/folkets_sv_en_public.xml'))
 KAIKKI_JSONL_PATH = os.getenv('KAIKKI_JSONL_PATH', _resource('data/kaikki.org-dictionary-Swedish.jsonl'))
+# compiled word_data + inflection_map, rebuilt automatically when the sources change
+LEXICON_SNAPSHOT_PATH = os.getenv('LEXICON_SNAPSHOT_PATH', _resource('data/lexicon.snapshot'))
+# how word_data is held in memory:
+#   'lazy'    - decode a word's details from the snapshot on first lookup (LRU of hot entries)
+#   'compact' - everything in memory as struct-of-arrays over a shared string table
+#   'dict'    - plain dicts, as parsed
+LEXICON_STORE = os.getenv('LEXICON_STORE', 'lazy')
+LEXICON_CACHE_SIZE = int(os.getenv('LEXICON_CACHE_SIZE', '512'))
+# how long a lookup waits for a still-loading lexicon before answering 503
+LEXICON_READY_TIMEOUT = float(os.getenv('LEXICON_READY_TIMEOUT', '5'))
 
 # --- Audio ---
 AUDIO_DIR = os.getenv('AUDIO_DIR', 'audio')
 ANKI_MEDIA_DIR = os.getenv('ANKI_MEDIA_DIR', '/Users/danielreedy/Library/Application Support/Anki2/User 1/collection.media')
 
+# --- Images ---
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '600'))    # px, longest side
+IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+IMAGE_MAX_DOWNLOAD_BYTES = int(os.getenv('IMAGE_MAX_DOWNLOAD_BYTES', str(15 * 1024 * 1024)))
+
+# --- Prefetch ---
+# /lookup starts audio and image fetches for the resolved word in the background
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', '1') != '0'
+PREFETCH_MAX_WORKERS = int(os.getenv('PREFETCH_MAX_WORKERS', '4'))
+PREFETCH_TTL_SECONDS = float(os.getenv('PREFETCH_TTL_SECONDS', '120'))
+PREFETCH_MAX_WORDS = int(os.getenv('PREFETCH_MAX_WORDS', '8'))
+
 # --- Anki ---
 ANKI_CONNECT_URL = 'http://localhost:8765'
 ANKI_DECK_NAME = 'Swedish'
 ANKI_MODEL_NAME = 'Basic'
+ANKI_BATCH_SIZE = int(os.getenv('ANKI_BATCH_SIZE', '100'))  # actions per AnkiConnect multi request
+ANKI_HEALTH_TTL_SECONDS = float(os.getenv('ANKI_HEALTH_TTL_SECONDS', '5'))        # cached reachability
+ANKI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('ANKI_CIRCUIT_FAILURE_THRESHOLD', '3'))  # failures before failing fast
+ANKI_CIRCUIT_RESET_SECONDS = float(os.getenv('ANKI_CIRCUIT_RESET_SECONDS', '5'))  # probe interval while open
+ANKI_DECKS_TTL_SECONDS = float(os.getenv('ANKI_DECKS_TTL_SECONDS', '300'))
+
+# --- Outbox (cards queued while Anki is unreachable) ---
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '20'))                  # cards per drain round
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+OUTBOX_RETRY_SECONDS = float(os.getenv('OUTBOX_RETRY_SECONDS', '30'))          # first retry of a failed card, then doubles
+OUTBOX_OFFLINE_BACKOFF_SECONDS = float(os.getenv('OUTBOX_OFFLINE_BACKOFF_SECONDS', '60'))  # cap while Anki is closed
+OUTBOX_DONE_TTL_HOURS = float(os.getenv('OUTBOX_DONE_TTL_HOURS', '168'))       # delivered tickets stay queryable this long
 
 # --- Claude ---
 CLAUDE_MODEL = 'claude-haiku-4-5-20251001'
 CLAUDE_MAX_TOKENS = 50
+CLAUDE_TIMEOUT = float(os.getenv('CLAUDE_TIMEOUT', '20'))            # seconds per API call
+CLAUDE_MAX_CONCURRENCY = int(os.getenv('CLAUDE_MAX_CONCURRENCY', '4'))
+CREATE_CARD_DEADLINE = float(os.getenv('CREATE_CARD_DEADLINE', '45'))  # seconds for the whole request
+
+# --- Local caches ---
+# user-writable, outside the (possibly read-only) app bundle
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.expanduser('~'), '.swedish-anki'))
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(CACHE_DIR, 'llm_cache.sqlite3'))
+LLM_CACHE_TTL_DAYS = float(os.getenv('LLM_CACHE_TTL_DAYS', '365'))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '100000'))
+# lexicon source fingerprints verified by hash, kept here when the snapshot
+# itself can't be rewritten (e.g. the read-only bundled one)
+LEXICON_SOURCES_PATH = os.getenv('LEXICON_SOURCES_PATH', os.path.join(CACHE_DIR, 'lexicon_sources.json'))
+AUDIO_INDEX_PATH = os.getenv('AUDIO_INDEX_PATH', os.path.join(CACHE_DIR, 'audio_index.sqlite3'))
+# words Forvo has no pronunciation for are not re-queried until this expires
+AUDIO_NEGATIVE_TTL_HOURS = float(os.getenv('AUDIO_NEGATIVE_TTL_HOURS', '168'))
+IMAGE_CACHE_PATH = os.getenv('IMAGE_CACHE_PATH', os.path.join(CACHE_DIR, 'image_cache.sqlite3'))
+IMAGE_CACHE_TTL_HOURS = float(os.getenv('IMAGE_CACHE_TTL_HOURS', '720'))
+# local copy of the notes already in Anki, for "already in deck" on lookup
+ANKI_NOTE_INDEX_PATH = os.getenv('ANKI_NOTE_INDEX_PATH', os.path.join(CACHE_DIR, 'anki_notes.sqlite3'))
+ANKI_NOTE_INDEX_REFRESH_SECONDS = float(os.getenv('ANKI_NOTE_INDEX_REFRESH_SECONDS', '300'))
+ANKI_NOTE_INDEX_FULL_SYNC_HOURS = float(os.getenv('ANKI_NOTE_INDEX_FULL_SYNC_HOURS', '24'))
+# cards waiting for Anki (see the Outbox settings above)
+OUTBOX_PATH = os.getenv('OUTBOX_PATH', os.path.join(CACHE_DIR, 'outbox.sqlite3'))
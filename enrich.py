@@ -0,0 +1,227 @@
+"""
+Offline bulk enrichment: pre-generate improved translations and missing
+Swedish definitions for the whole lexicon, so /lookup and /create-card
+rarely have to wait on Claude.
+
+    python enrich.py --frequency-list data/frequency.txt --concurrency 16 --rpm 200
+
+Words are processed in priority order (words in the frequency list first,
+in list order, then the rest). Results go into the LLM cache, which the
+server applies to lexicon entries as they are read. Each finished word is
+checkpointed in the same database, so an interrupted run resumes where it
+stopped; words that failed, or whose answers have since expired or been
+evicted from the cache, are enriched again on the next run.
+
+Point ANTHROPIC_BASE_URL at a local fake endpoint to try it without
+spending tokens.
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Optional
+
+import translation
+from config import CLAUDE_MODEL
+from lexicon import load_lexicon
+from translation import (
+    cache, improve_translations, generate_definitions, apply_cached_answers,
+    IMPROVE_PROMPT_VERSION, DEFINITION_PROMPT_VERSION,
+)
+
+# checkpoints are per model and prompt version, so bumping either re-runs the job
+JOB_NAME = f'enrich:{CLAUDE_MODEL}:{IMPROVE_PROMPT_VERSION}:{DEFINITION_PROMPT_VERSION}'
+
+# words submitted ahead of the workers, per worker
+WINDOW_PER_WORKER = 2
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate_per_minute` acquisitions per minute
+    on average, with bursts of up to `burst`. acquire() blocks until a token
+    is available.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst or max(1, int(self.rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_frequency_list(path: str) -> list[str]:
+    """
+    Read a frequency list: one word per line, most frequent first. Anything
+    after the first whitespace (e.g. a count) is ignored, as are blank lines
+    and lines starting with '#'.
+    """
+    words = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                words.append(line.split()[0].lower())
+    return words
+
+
+def priority_order(word_data, inflection_map: dict, frequency_list: Optional[list] = None) -> list[str]:
+    """
+    Return every word in word_data, frequency-list words first. Inflected
+    forms in the list count towards their base word.
+    """
+    ordered = []
+    seen = set()
+    for form in frequency_list or []:
+        word = form if form in word_data else inflection_map.get(form)
+        if word and word not in seen:
+            seen.add(word)
+            ordered.append(word)
+
+    ordered.extend(word for word in word_data if word not in seen)
+    return ordered
+
+
+def needs_enrichment(details: dict) -> bool:
+    return any(
+        not d.get('improved_translation') or not d.get('definition')
+        for d in details['definitions']
+    )
+
+
+def enrich_word(word: str, details: dict) -> int:
+    """
+    Improve every sense's translation, then generate the missing definitions
+    (their prompt uses the improved translation). Each step is one batched
+    Claude call for all senses; cached senses cost nothing.
+    Returns the number of definitions generated.
+    """
+    definitions = details['definitions']
+    improve_translations(word, [d for d in definitions if not d.get('improved_translation')])
+
+    missing = [d for d in definitions if not d.get('definition')]
+    if missing:
+        generate_definitions(word, missing)
+    return len(missing)
+
+
+def run(
+    word_data,
+    words: list[str],
+    concurrency: int,
+    limit: Optional[int] = None,
+) -> dict:
+    """Enrich `words` concurrently, checkpointing each one. Returns run totals."""
+    done = cache.completed(JOB_NAME)
+    # a checkpoint only holds while its answers are still cached: the cache
+    # expires and evicts entries, and words that lost theirs are enriched again
+    todo = [
+        w for w in words
+        if needs_enrichment(word_data[w])
+        and (w not in done or needs_enrichment(apply_cached_answers(w, word_data[w])))
+    ]
+    if limit is not None:
+        todo = todo[:limit]
+    redo = sum(w in done for w in todo)
+
+    print(
+        f'{len(done) - redo} words already done, {len(todo)} to enrich '
+        f'({redo} evicted from the cache) with {concurrency} workers'
+    )
+
+    totals = {'words': 0, 'definitions': 0, 'failed': 0}
+    start = time.perf_counter()
+
+    def work(word):
+        # senses are mutated in place, so enrich a private copy of the entry
+        details = {'definitions': [dict(d) for d in word_data[word]['definitions']]}
+        return enrich_word(word, details)
+
+    def finish(future, word):
+        try:
+            totals['definitions'] += future.result()
+            totals['words'] += 1
+            cache.mark(JOB_NAME, word, 'done')
+        except Exception as e:
+            totals['failed'] += 1
+            cache.mark(JOB_NAME, word, 'failed')
+            print(f'Enrichment failed for "{word}": {e}')
+
+        finished = totals['words'] + totals['failed']
+        if finished % 100 == 0 or finished == len(todo):
+            elapsed = time.perf_counter() - start
+            print(
+                f'{finished}/{len(todo)} words, {totals["definitions"]} definitions, '
+                f'{totals["failed"]} failed, {finished / elapsed:.1f} words/s'
+            )
+
+    # only a small window of words is in flight, so Ctrl-C stops after the
+    # words already sent (each checkpointed) instead of draining the whole queue
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='enrich')
+    pending = {}
+    try:
+        for word in todo:
+            pending[executor.submit(work, word)] = word
+            if len(pending) >= WINDOW_PER_WORKER * concurrency:
+                done_futures, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    finish(future, pending.pop(future))
+        for future in as_completed(list(pending)):
+            finish(future, pending.pop(future))
+    except KeyboardInterrupt:
+        print(f'Interrupted, finishing {len(pending)} words in flight...')
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future, word in pending.items():
+            if future.done() and not future.cancelled():
+                finish(future, word)
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-generate Claude translations and definitions')
+    parser.add_argument('--frequency-list', help='words to enrich first, one per line, most frequent first')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rpm', type=float, default=50, help='max Claude requests per minute')
+    parser.add_argument('--limit', type=int, help='stop after this many words')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    word_data, inflection_map = load_lexicon()
+    frequency_list = load_frequency_list(args.frequency_list) if args.frequency_list else None
+    words = priority_order(word_data, inflection_map, frequency_list)
+
+    translation.rate_limiter = TokenBucket(args.rpm)
+
+    start = time.perf_counter()
+    try:
+        totals = run(word_data, words, concurrency=args.concurrency, limit=args.limit)
+    except KeyboardInterrupt:
+        print('Stopped. Finished words are checkpointed; run again to resume.')
+        sys.exit(130)
+    print(
+        f'Enriched {totals["words"]} words ({totals["definitions"]} definitions generated, '
+        f'{totals["failed"]} failed) in {time.perf_counter() - start:.1f}s'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@ a = Analysis(
     datas=[
         ('data/folkets_sv_en_public.xml', 'data'),
         ('data/kaikki.org-dictionary-Swedish.jsonl', 'data'),
+        ('data/lexicon.snapshot', 'data'),
     ],
     hiddenimports=[
         'flask_cors',
@@ -0,0 +1,152 @@
+"""
+Shared outbound HTTP layer for Forvo, Wikimedia, Serper and AnkiConnect.
+
+One pooled requests.Session per host keeps connections alive between calls,
+so repeated requests skip the TCP/TLS handshake. Each host has a timeout
+budget and retry count; only idempotent calls are retried, with exponential
+backoff. Every attempt is recorded in a per-host latency histogram
+(see latency_stats(), served at /stats/http).
+"""
+import threading
+import time
+from collections import namedtuple
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import ANKI_CONNECT_URL
+
+# (connect, read) timeouts in seconds and retries for idempotent calls
+HostPolicy = namedtuple('HostPolicy', ['timeout', 'retries'])
+
+DEFAULT_POLICY = HostPolicy(timeout=(3.05, 10), retries=2)
+HOST_POLICIES = {
+    # local and usually instant; fail fast so /health and /create-card don't stall
+    urlsplit(ANKI_CONNECT_URL).netloc: HostPolicy(timeout=(0.5, 5), retries=1),
+    'apifree.forvo.com': HostPolicy(timeout=(3.05, 10), retries=2),
+    'en.wikipedia.org': HostPolicy(timeout=(3.05, 6), retries=2),
+    'google.serper.dev': HostPolicy(timeout=(3.05, 10), retries=2),
+}
+
+POOL_CONNECTIONS = 4   # distinct pools per session (one host each, so small)
+POOL_MAXSIZE = 16      # kept-alive connections per host, >= the app's worker threads
+
+BACKOFF_SECONDS = 0.25          # first retry waits this long, then doubles
+MAX_RETRY_AFTER_SECONDS = 5.0   # cap on a server's Retry-After
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# histogram bucket upper bounds in milliseconds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_sessions = {}
+_histograms = {}
+_lock = threading.Lock()
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def _session(host: str) -> requests.Session:
+    """Return the pooled keep-alive session for a host, creating it on first use."""
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _sessions[host] = session
+    return session
+
+
+def _record(host: str, elapsed_ms: float, outcome: str):
+    with _lock:
+        stats = _histograms.get(host)
+        if stats is None:
+            stats = _histograms[host] = {
+                'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                'count': 0,
+                'total_ms': 0.0,
+                'outcomes': {},
+            }
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound),
+                      len(LATENCY_BUCKETS_MS))
+        stats['buckets'][bucket] += 1
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+
+
+def _retry_delay(attempt: int, response: Optional[requests.Response]) -> float:
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_RETRY_AFTER_SECONDS)
+    return BACKOFF_SECONDS * (2 ** attempt)
+
+
+def request(method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+    """
+    Send a request through the host's pooled session.
+
+    `idempotent` defaults to the HTTP method's semantics; pass True for POSTs
+    that only read (a search, an AnkiConnect query) so they are retried too.
+    Retries happen on connection errors, timeouts and 429/5xx responses.
+    A caller-supplied `timeout` overrides the host's budget.
+    """
+    method = method.upper()
+    host = _host(url)
+    policy = HOST_POLICIES.get(host, DEFAULT_POLICY)
+    kwargs.setdefault('timeout', policy.timeout)
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    retries = policy.retries if idempotent else 0
+    session = _session(host)
+
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            _record(host, (time.perf_counter() - start) * 1000, type(e).__name__)
+            if attempt == retries:
+                raise
+            time.sleep(_retry_delay(attempt, None))
+            continue
+
+        _record(host, (time.perf_counter() - start) * 1000, str(response.status_code))
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            time.sleep(_retry_delay(attempt, response))
+            continue
+        return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, idempotent: bool = False, **kwargs) -> requests.Response:
+    return request('POST', url, idempotent=idempotent, **kwargs)
+
+
+def latency_stats() -> dict:
+    """
+    Per-host latency histograms of every attempt so far:
+    { host: { 'count', 'mean_ms', 'buckets': {'<=10ms': n, ..., '>5000ms': n}, 'outcomes': {...} } }
+    """
+    labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+    with _lock:
+        return {
+            host: {
+                'count': stats['count'],
+                'mean_ms': round(stats['total_ms'] / stats['count'], 1),
+                'buckets': dict(zip(labels, stats['buckets'])),
+                'outcomes': dict(stats['outcomes']),
+            }
+            for host, stats in sorted(_histograms.items())
+        }
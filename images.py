@@ -1,9 +1,118 @@
-import requests
-from config import SERPER_DEV_API_KEY
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import http_client
+from config import SERPER_DEV_API_KEY, IMAGE_CACHE_PATH, IMAGE_CACHE_TTL_HOURS
 
 WIKIMEDIA_API = 'https://en.wikipedia.org/api/rest_v1/page/summary'
 SERPER_API = 'https://google.serper.dev/images'
 
+# Serper locale: Swedish results (gl) in Swedish (hl)
+SERPER_COUNTRY = 'se'
+SERPER_LANGUAGE = 'sv'
+
+CACHE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS image_cache (
+    key         TEXT PRIMARY KEY,
+    urls        TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+'''
+
+# providers are queried side by side instead of one after the other
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='images')
+
+
+class ImageSearchCache:
+    """
+    On-disk TTL cache of image search results keyed by (query, locale, num),
+    so repeated and custom searches skip the network and Serper quota.
+    """
+
+    def __init__(self, path: str, ttl_hours: float):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(CACHE_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(query: str, locale: str, num: int) -> str:
+        return json.dumps([query.strip().lower(), locale, num], ensure_ascii=False)
+
+    def get(self, query: str, locale: str, num: int) -> Optional[list[str]]:
+        try:
+            row = self._connect().execute(
+                'SELECT urls, created_at FROM image_cache WHERE key = ?', (self.make_key(query, locale, num),)
+            ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            print(f'Image cache read failed: {e}')
+            return None
+
+        if not row or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return json.loads(row[0])
+
+    def put(self, query: str, locale: str, num: int, urls: list[str]):
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM image_cache WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+                conn.execute(
+                    'INSERT OR REPLACE INTO image_cache (key, urls, created_at) VALUES (?, ?, ?)',
+                    (self.make_key(query, locale, num), json.dumps(urls), time.time())
+                )
+        except (sqlite3.Error, OSError) as e:
+            print(f'Image cache write failed: {e}')
+
+
+cache = ImageSearchCache(IMAGE_CACHE_PATH, ttl_hours=IMAGE_CACHE_TTL_HOURS)
+
+
+def _query_wikimedia(word: str) -> list[str]:
+    """Wikipedia summary thumbnail for a word. Raises on network errors."""
+    response = http_client.get(f'{WIKIMEDIA_API}/{word}')
+    if response.status_code != 200:
+        return []
+    data = response.json()
+    thumbnail = data.get('thumbnail', {}).get('source')
+    return [thumbnail] if thumbnail else []
+
+
+def _query_serper(word: str, num: int) -> list[str]:
+    """Google Images results via Serper. Raises on network and API errors."""
+    # a search only reads, so it is safe to retry
+    response = http_client.post(
+        SERPER_API,
+        idempotent=True,
+        headers={
+            'X-API-KEY': SERPER_DEV_API_KEY,
+            'Content-Type': 'application/json'
+        },
+        json={
+            'q': word,
+            'gl': SERPER_COUNTRY,   # Swedish locale
+            'hl': SERPER_LANGUAGE,  # Swedish language
+            'num': num
+        },
+    )
+    response.raise_for_status()
+    results = response.json().get('images', [])
+    return [r['imageUrl'] for r in results if 'imageUrl' in r]
+
 
 def get_wikimedia_images(word: str) -> list[str]:
     """
@@ -11,12 +120,7 @@ def get_wikimedia_images(word: str) -> list[str]:
     Returns a list with one URL if found, empty list otherwise.
     """
     try:
-        response = requests.get(f'{WIKIMEDIA_API}/{word}', timeout=10)
-        if response.status_code != 200:
-            return []
-        data = response.json()
-        thumbnail = data.get('thumbnail', {}).get('source')
-        return [thumbnail] if thumbnail else []
+        return _query_wikimedia(word)
     except Exception as e:
         print(f'Wikimedia error for "{word}": {e}')
         return []
@@ -29,23 +133,7 @@ def get_serper_images(word: str, num: int = 5) -> list[str]:
     Returns a list of image URLs.
     """
     try:
-        response = requests.post(
-            SERPER_API,
-            headers={
-                'X-API-KEY': SERPER_DEV_API_KEY,
-                'Content-Type': 'application/json'
-            },
-            json={
-                'q': word,
-                'gl': 'se',   # Swedish locale
-                'hl': 'sv',   # Swedish language
-                'num': num
-            },
-            timeout=10
-        )
-        response.raise_for_status()
-        results = response.json().get('images', [])
-        return [r['imageUrl'] for r in results if 'imageUrl' in r]
+        return _query_serper(word, num)
     except Exception as e:
         print(f'Serper error for "{word}": {e}')
         return []
@@ -53,21 +141,41 @@ def get_serper_images(word: str, num: int = 5) -> list[str]:
 
 def get_images(word: str, num: int = 5) -> list[str]:
     """
-    Waterfall image search:
-    1. Try Wikimedia (free, no rate limits)
-    2. Fall back to Serper (paid, broader coverage)
+    Image search across providers:
+    1. Wikimedia (free, no rate limits) — ranked first
+    2. Serper (paid, broader coverage) — tops up the rest
+    Both are queried concurrently. Results are cached on disk for
+    IMAGE_CACHE_TTL_HOURS unless a provider failed, so a transient
+    error isn't remembered.
     Returns up to `num` image URLs.
     """
-    images = get_wikimedia_images(word)
-
-    # if Wikimedia only gave us 1, top up with Serper results
-    if len(images) < num:
-        serper_images = get_serper_images(word, num=num)
-        # deduplicate while preserving order
-        seen = set(images)
-        for img in serper_images:
-            if img not in seen:
-                images.append(img)
-                seen.add(img)
-
-    return images[:num]
+    locale = f'{SERPER_COUNTRY}-{SERPER_LANGUAGE}'
+    cached = cache.get(word, locale, num)
+    if cached is not None:
+        return cached
+
+    wikimedia = _pool.submit(_query_wikimedia, word)
+    serper = _pool.submit(_query_serper, word, num)
+
+    failed = False
+    results = []
+    for name, future in (('Wikimedia', wikimedia), ('Serper', serper)):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f'{name} error for "{word}": {e}')
+            results.append([])
+            failed = True
+
+    # deduplicate while preserving order, Wikimedia first
+    images = []
+    seen = set()
+    for img in results[0] + results[1]:
+        if img not in seen:
+            images.append(img)
+            seen.add(img)
+    images = images[:num]
+
+    if images and not failed:
+        cache.put(word, locale, num, images)
+    return images
@@ -1,7 +1,59 @@
+import argparse
+import gc
+import hashlib
 import json
+import logging
+import mmap
+import os
+import pickle
+import re
+import threading
+import time
 import xml.etree.ElementTree as ET
-from typing import Optional
-from config import FOLKETS_XML_PATH, KAIKKI_JSONL_PATH
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Callable, Optional
+from compounds import CompoundSplitter
+from search import ReverseIndex, SearchIndex
+from config import (
+    FOLKETS_XML_PATH, KAIKKI_JSONL_PATH, LEXICON_SNAPSHOT_PATH, LEXICON_SOURCES_PATH,
+    LEXICON_STORE, LEXICON_CACHE_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _log_event(event: str, **fields):
+    """Emit a structured event as a single JSON line on the lexicon logger."""
+    logger.info(json.dumps({'event': event, **fields}, ensure_ascii=False))
+
+
+@contextmanager
+def _timed_phase(phase: str):
+    """Time a build phase and emit a `lexicon.phase` event when it completes."""
+    start = time.perf_counter()
+    yield
+    _log_event('lexicon.phase', phase=phase, duration_ms=round((time.perf_counter() - start) * 1000, 1))
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Skip GC passes while decoding many small objects. The collector is
+    process-wide, so this only applies on the main thread (synchronous
+    startup, the CLI); a background load runs alongside request threads
+    and leaves it alone. The previous state is restored either way.
+    """
+    if threading.current_thread() is not threading.main_thread() or not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
 
 # ---------------------------------------------------------------------------
 # Class definitions
@@ -31,92 +83,54 @@ CLASS_DEFINITIONS = {
 }
 
 # ---------------------------------------------------------------------------
-# XML parsing
+# Kaikki / Wiktionary noun senses
 # ---------------------------------------------------------------------------
 
-def parse_element(element):
-    """Recursively parse an XML element into a dict."""
-    entry = {'tag': element.tag}
-    entry.update(element.attrib)
-
-    if element.text and element.text.strip():
-        entry['text'] = element.text.strip()
-
-    children = [parse_element(child) for child in element]
-    if children:
-        entry['children'] = children
+# per-word gender bitmask stored in noun_senses
+GENDER_EN = 1
+GENDER_ETT = 2
 
-    return entry
+# top-level "pos" as serialized by the Kaikki dump, used to skip lines before decoding
+_NOUN_MARKERS = (b'"pos": "noun"', b'"pos":"noun"')
+_READ_BUFFER_SIZE = 4 << 20
 
 
-def build_lexicon(xml_path: str) -> dict:
-    """Parse the Folkets XML and return the raw lexicon dict."""
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-    lexicon = {}
+def _sense_gender(tags: list) -> int:
+    """Return the gender bit for a Wiktionary sense's tags (0 if ungendered)."""
+    if 'neuter' in tags:
+        return GENDER_ETT
+    if 'common-gender' in tags or 'masculine' in tags or 'feminine' in tags:
+        return GENDER_EN
+    return 0
 
-    for word in root.findall('word'):
-        swedish = word.get('value')
-        is_compound = '|' in swedish
-        compound_delineated = swedish if is_compound else None
-
-        if is_compound:
-            swedish = swedish.replace('|', '')
-
-        word_data = {
-            'attributes': dict(word.attrib),
-            'children': [parse_element(child) for child in word]
-        }
-
-        if is_compound:
-            word_data['children'].append({
-                'tag': 'compound delineation',
-                'value': compound_delineated
-            })
-
-        if swedish in lexicon:
-            lexicon[swedish].append(word_data)
-        else:
-            lexicon[swedish] = [word_data]
-
-    return lexicon
-
-
-# ---------------------------------------------------------------------------
-# Kaikki / Wiktionary noun senses
-# ---------------------------------------------------------------------------
 
 def build_noun_senses(jsonl_path: str) -> dict:
-    """Parse the Wiktionary JSONL and return noun gender senses."""
+    """
+    Parse the Wiktionary JSONL and return {word: gender bitmask} for nouns.
+    Lines are scanned as raw bytes and only those carrying a noun `pos` are
+    JSON-decoded; words with no gendered sense are left out entirely.
+    """
     noun_senses = {}
 
-    with open(jsonl_path, 'r') as f:
+    with open(jsonl_path, 'rb', buffering=_READ_BUFFER_SIZE) as f:
         for line in f:
+            if _NOUN_MARKERS[0] not in line and _NOUN_MARKERS[1] not in line:
+                continue
+
             entry = json.loads(line)
 
+            # the marker can also occur in nested data — confirm on the decoded entry
             if entry.get('pos') != 'noun':
                 continue
 
-            word = entry.get('word')
-
+            mask = 0
             for sense in entry.get('senses', []):
-                tags = sense.get('tags', [])
-                glosses = sense.get('glosses', [])
+                if sense.get('glosses'):
+                    mask |= _sense_gender(sense.get('tags', []))
 
-                if 'neuter' in tags:
-                    article = 'ett'
-                elif 'common-gender' in tags or 'masculine' in tags or 'feminine' in tags:
-                    article = 'en'
-                else:
-                    article = None
-
-                for gloss in glosses:
-                    if word not in noun_senses:
-                        noun_senses[word] = []
-                    noun_senses[word].append({
-                        'gloss': gloss,
-                        'article': article
-                    })
+            if mask:
+                word = entry.get('word')
+                noun_senses[word] = noun_senses.get(word, 0) | mask
 
     return noun_senses
 
@@ -127,70 +141,98 @@ def build_noun_senses(jsonl_path: str) -> dict:
 
 def get_noun_article(word: str, noun_senses: dict) -> Optional[str]:
     """Return 'en word', 'ett word', 'en/ett word', or None."""
-    if word not in noun_senses:
-        return None
-
-    articles = {sense['article'] for sense in noun_senses[word]}
+    mask = noun_senses.get(word, 0)
 
-    if 'en' in articles and 'ett' in articles:
+    if mask & GENDER_EN and mask & GENDER_ETT:
         return f'en/ett {word}'
-    elif 'en' in articles:
+    elif mask & GENDER_EN:
         return f'en {word}'
-    elif 'ett' in articles:
+    elif mask & GENDER_ETT:
         return f'ett {word}'
     return None
 
 
-def get_word_details(word: str, lexicon: dict, noun_senses: dict) -> dict:
-    """Extract a clean details dict for a single word from the raw lexicon."""
-    word_elements = lexicon[word]
-    word_definitions = []
-
-    for word_element in word_elements:
-        definition_dict = {}
-        word_class = word_element.get('attributes', {}).get('class')
-        definition_dict['class'] = CLASS_DEFINITIONS.get(word_class, 'okategoriserad')
-
-        synonyms = []
-        inflections = []
-
-        for tag in word_element['children']:
-            t = tag['tag']
-            if t == 'compound delineation':
-                definition_dict['compound_delineation'] = tag['value']
-            elif t == 'definition':
-                definition_dict['definition'] = tag.get('value', '')
-            elif t == 'translation':
-                definition_dict['translation'] = tag.get('value', '')
-            elif t == 'phonetic':
-                definition_dict['phonetic'] = tag.get('value', '')
-            elif t == 'example':
-                definition_dict['example'] = tag.get('value', '')
-            elif t == 'synonym':
-                synonyms.append(tag.get('value', ''))
-            elif t == 'paradigm':
-                for child in tag.get('children', []):
-                    inflections.append(child.get('value', ''))
-
-        definition_dict['synonyms'] = synonyms
-        definition_dict['inflections'] = inflections
-        word_definitions.append(definition_dict)
-
-    return {
-        'word with article': get_noun_article(word=word, noun_senses=noun_senses),
-        'definitions': word_definitions,
-    }
+# ---------------------------------------------------------------------------
+# Streaming XML parsing
+# ---------------------------------------------------------------------------
 
+def get_definition_details(word_element: ET.Element) -> dict:
+    """Extract a clean definition dict from a single Folkets <word> element."""
+    definition_dict = {}
+    word_class = word_element.get('class')
+    definition_dict['class'] = CLASS_DEFINITIONS.get(word_class, 'okategoriserad')
+
+    synonyms = []
+    inflections = []
+
+    for child in word_element:
+        t = child.tag
+        if t == 'definition':
+            definition_dict['definition'] = child.get('value', '')
+        elif t == 'translation':
+            definition_dict['translation'] = child.get('value', '')
+        elif t == 'phonetic':
+            definition_dict['phonetic'] = child.get('value', '')
+        elif t == 'example':
+            definition_dict['example'] = child.get('value', '')
+        elif t == 'synonym':
+            synonyms.append(child.get('value', ''))
+        elif t == 'paradigm':
+            for inflection in child:
+                inflections.append(inflection.get('value', ''))
+
+    swedish = word_element.get('value')
+    if '|' in swedish:
+        definition_dict['compound_delineation'] = swedish
+
+    definition_dict['synonyms'] = synonyms
+    definition_dict['inflections'] = inflections
+    return definition_dict
+
+
+def iter_word_definitions(xml_path: str):
+    """
+    Stream the Folkets XML and yield (swedish, definition_dict) for every
+    top-level <word>. Each element is discarded as soon as it has been read,
+    so memory stays flat regardless of the size of the file.
+    """
+    context = ET.iterparse(xml_path, events=('start', 'end'))
+    _, root = next(context)
+    depth = 1
+
+    for event, element in context:
+        if event == 'start':
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1 and element.tag == 'word':
+            swedish = element.get('value').replace('|', '')
+            yield swedish, get_definition_details(element)
+            # drop the finished <word> (and any siblings) from the root
+            root.clear()
 
-def build_word_data(lexicon: dict, noun_senses: dict) -> dict:
-    """Build the full word_data dict for every word in the lexicon."""
+
+def build_word_data(xml_path: str, noun_senses: dict, progress: Optional[Callable] = None) -> dict:
+    """
+    Build the full word_data dict in a single streaming pass over the XML.
+    `progress`, if given, is called with the number of words parsed so far.
+    """
     word_data = {}
-    for word in lexicon.keys():
-        word_data[word] = get_word_details(
-            word=word,
-            lexicon=lexicon,
-            noun_senses=noun_senses
-        )
+    for i, (word, definition) in enumerate(iter_word_definitions(xml_path), 1):
+        if progress and i % 1000 == 0:
+            progress(len(word_data))
+
+        if word in word_data:
+            word_data[word]['definitions'].append(definition)
+        else:
+            word_data[word] = {
+                'word with article': get_noun_article(word=word, noun_senses=noun_senses),
+                'definitions': [definition],
+            }
+
+    if progress:
+        progress(len(word_data))
     return word_data
 
 
@@ -208,33 +250,661 @@ def build_inflection_map(word_data: dict) -> dict:
 # Lookup
 # ---------------------------------------------------------------------------
 
-def lookup_word(word: str, word_data: dict, inflection_map: dict) -> Optional[dict]:
+# words in running text, keeping hyphenated compounds like 'e-post' together
+_SWEDISH_TOKEN = re.compile(r'[^\W\d_]+(?:-[^\W\d_]+)*')
+
+
+def tokenize_text(text: str) -> list[str]:
+    """Split raw Swedish text into lowercase word tokens."""
+    return [token.lower() for token in _SWEDISH_TOKEN.findall(text or '')]
+
+
+# ---------------------------------------------------------------------------
+# Compiled snapshot
+# ---------------------------------------------------------------------------
+
+# bump whenever the shape of word_data / inflection_map changes
+SNAPSHOT_VERSION = 2
+SNAPSHOT_MAGIC = b'SWLEXSNP'
+
+
+def _file_hash(path: str) -> str:
+    """Return the sha256 of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_fingerprint(path: str, with_hash: bool = True) -> dict:
+    """Describe a source file by name, size, mtime and (optionally) content hash."""
+    stat = os.stat(path)
+    fingerprint = {
+        'name': os.path.basename(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+    if with_hash:
+        fingerprint['sha256'] = _file_hash(path)
+    return fingerprint
+
+
+def _sources_match(recorded: list, source_paths: list, verified: Optional[dict] = None) -> Optional[list]:
     """
-    Look up a word by its base form or any inflected form.
-    Returns {base_word: word_details} or None if not found.
+    Compare recorded source fingerprints against the files on disk.
+    Returns the current fingerprints if the contents match, or None if any
+    source changed. A source whose mtime moved (e.g. after copying into a
+    bundle) is hashed, unless `verified` (see _load_verified_sources) already
+    holds its current size, mtime and the recorded hash.
+    """
+    if len(recorded) != len(source_paths):
+        return None
+
+    current = []
+    for fingerprint, path in zip(recorded, source_paths):
+        stat = _source_fingerprint(path, with_hash=False)
+        if fingerprint['name'] != stat['name'] or fingerprint['size'] != stat['size']:
+            return None
+        stat['sha256'] = fingerprint['sha256']
+        if fingerprint['mtime_ns'] != stat['mtime_ns']:
+            # same size but touched — only a content hash can tell us
+            known = (verified or {}).get(os.path.abspath(path))
+            if known != stat and fingerprint['sha256'] != _file_hash(path):
+                return None
+        current.append(stat)
+
+    return current
+
+
+def _load_verified_sources(path: str) -> dict:
+    """Source fingerprints already verified by hash, keyed by absolute source path."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_verified_sources(path: str, source_paths: list, sources: list):
+    """Record verified fingerprints beside a snapshot whose header can't be rewritten."""
+    verified = _load_verified_sources(path)
+    verified.update({os.path.abspath(p): fingerprint for p, fingerprint in zip(source_paths, sources)})
+    tmp_path = f'{path}.tmp'
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(verified, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f'Could not record lexicon source fingerprints in {path}: {e}')
+
+
+def save_snapshot(snapshot_path: str, word_data: dict, inflection_map: dict, sources: list):
+    """
+    Write word_data and inflection_map to a versioned binary snapshot.
+
+    Layout: magic, header pickle (version + source fingerprints), index pickle
+    (word order, byte offsets, inflection_map), then one pickle blob per word.
+    The header is separate so staleness can be checked without decoding the
+    rest, and per-word blobs let lazy mode decode single entries on demand.
+    Written atomically via a temp file.
+    """
+    header = {'version': SNAPSHOT_VERSION, 'sources': sources}
+
+    words = []
+    offsets = array('Q', [0])
+    blobs = []
+    for word, details in word_data.items():
+        blob = pickle.dumps(details, protocol=pickle.HIGHEST_PROTOCOL)
+        words.append(word)
+        blobs.append(blob)
+        offsets.append(offsets[-1] + len(blob))
+
+    index = {
+        'words': words,
+        'offsets': offsets.tobytes(),
+        'inflection_map': inflection_map,
+    }
+
+    tmp_path = f'{snapshot_path}.tmp'
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, snapshot_path)
+
+
+def _rewrite_snapshot_header(snapshot_path: str, sources: list):
+    """Replace the source fingerprints of an existing snapshot, keeping its payload."""
+    tmp_path = f'{snapshot_path}.tmp'
+    with open(snapshot_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        src.read(len(SNAPSHOT_MAGIC))
+        pickle.load(src)
+        dst.write(SNAPSHOT_MAGIC)
+        pickle.dump({'version': SNAPSHOT_VERSION, 'sources': sources}, dst, protocol=pickle.HIGHEST_PROTOCOL)
+        for chunk in iter(lambda: src.read(1 << 20), b''):
+            dst.write(chunk)
+    os.replace(tmp_path, snapshot_path)
+
+
+class LazyWordData(Mapping):
+    """
+    Read-mostly word_data backed by a snapshot file.
+
+    Only the word index is held in memory; a word's details are decoded from
+    the memory-mapped snapshot on first access and kept in a small LRU.
+    Assigning to a word pins that entry in memory, so in-place updates such
+    as improved translations survive eviction.
     """
-    if word in word_data:
-        return {word: word_data[word]}
-    elif word in inflection_map:
-        base_word = inflection_map[word]
-        return {base_word: word_data[base_word]}
-    return None
+
+    def __init__(self, snapshot_path: str, data_start: int, words: list, offsets: bytes,
+                 cache_size: int = LEXICON_CACHE_SIZE):
+        self._file = open(snapshot_path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data_start = data_start
+        self._positions = {word: i for i, word in enumerate(words)}
+        self._offsets = array('Q')
+        self._offsets.frombytes(offsets)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    def _decode(self, position: int) -> dict:
+        start = self._data_start + self._offsets[position]
+        end = self._data_start + self._offsets[position + 1]
+        return pickle.loads(self._mmap[start:end])
+
+    def __getitem__(self, word: str) -> dict:
+        with self._lock:
+            if word in self._pinned:
+                return self._pinned[word]
+            if word in self._cache:
+                self._cache.move_to_end(word)
+                return self._cache[word]
+
+            details = self._decode(self._positions[word])
+            self._cache[word] = details
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return details
+
+    def __setitem__(self, word: str, details: dict):
+        if word not in self._positions:
+            raise KeyError(word)
+        with self._lock:
+            self._pinned[word] = details
+            self._cache.pop(word, None)
+
+    def __contains__(self, word) -> bool:
+        return word in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def items(self):
+        """Stream every (word, details) without disturbing the LRU — for index builds."""
+        for word, position in self._positions.items():
+            with self._lock:
+                pinned = self._pinned.get(word)
+            yield word, pinned if pinned is not None else self._decode(position)
+
+
+class CompactWordData(Mapping):
+    """
+    Memory-lean word_data: struct-of-arrays records over a shared string table.
+
+    Every distinct string (class labels, translations, inflections, ...) is
+    stored once, UTF-8 encoded in a single bytes blob and referenced by an
+    integer id. Each definition is a row across parallel per-field arrays
+    (-1 marks an absent key) and list fields are ranges into flat id arrays.
+    Details dicts are rebuilt on access and serialize to the same JSON as
+    the plain dicts (jsonify sorts keys). Assigning to a word pins that
+    entry, as with LazyWordData.
+    """
+
+    SCALAR_FIELDS = ('class', 'definition', 'translation', 'phonetic', 'example', 'compound_delineation')
+    LIST_FIELDS = ('synonyms', 'inflections')
+
+    def __init__(self, items):
+        string_ids = {}
+        chunks = []
+        self._string_offsets = array('I', [0])
+
+        def intern(text: str) -> int:
+            string_id = string_ids.get(text)
+            if string_id is None:
+                encoded = text.encode('utf-8')
+                string_id = string_ids[text] = len(chunks)
+                chunks.append(encoded)
+                self._string_offsets.append(self._string_offsets[-1] + len(encoded))
+            return string_id
+
+        known_fields = set(self.SCALAR_FIELDS) | set(self.LIST_FIELDS)
+
+        self._positions = {}
+        self._articles = array('i')
+        self._definition_starts = array('I', [0])
+        self._scalars = {field: array('i') for field in self.SCALAR_FIELDS}
+        # field -> (row start offsets into ids, flat string ids)
+        self._lists = {field: (array('I', [0]), array('i')) for field in self.LIST_FIELDS}
+        # definition row -> keys outside the fixed schema (rare, e.g. improved_translation)
+        self._extra = {}
+
+        rows = 0
+        for word, details in items:
+            self._positions[word] = len(self._positions)
+            article = details.get('word with article')
+            self._articles.append(-1 if article is None else intern(article))
+
+            for definition in details['definitions']:
+                for field, column in self._scalars.items():
+                    value = definition.get(field)
+                    column.append(-1 if value is None else intern(value))
+                for field, (starts, ids) in self._lists.items():
+                    ids.extend(intern(value) for value in definition.get(field, []))
+                    starts.append(len(ids))
+                extra = {k: v for k, v in definition.items() if k not in known_fields}
+                if extra:
+                    self._extra[rows] = extra
+                rows += 1
+
+            self._definition_starts.append(rows)
+
+        self._strings = b''.join(chunks)
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    def _string(self, string_id: int) -> str:
+        return self._strings[self._string_offsets[string_id]:self._string_offsets[string_id + 1]].decode('utf-8')
+
+    def _materialize(self, position: int) -> dict:
+        definitions = []
+        for row in range(self._definition_starts[position], self._definition_starts[position + 1]):
+            definition = {}
+            for field, column in self._scalars.items():
+                string_id = column[row]
+                if string_id != -1:
+                    definition[field] = self._string(string_id)
+            for field, (starts, ids) in self._lists.items():
+                definition[field] = [self._string(ids[i]) for i in range(starts[row], starts[row + 1])]
+            if row in self._extra:
+                definition.update(self._extra[row])
+            definitions.append(definition)
+
+        article = self._articles[position]
+        return {
+            'word with article': None if article == -1 else self._string(article),
+            'definitions': definitions,
+        }
+
+    def __getitem__(self, word: str) -> dict:
+        with self._lock:
+            pinned = self._pinned.get(word)
+        if pinned is not None:
+            return pinned
+        return self._materialize(self._positions[word])
+
+    def __setitem__(self, word: str, details: dict):
+        if word not in self._positions:
+            raise KeyError(word)
+        with self._lock:
+            self._pinned[word] = details
+
+    def __contains__(self, word) -> bool:
+        return word in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+
+def load_snapshot(
+    snapshot_path: str,
+    source_paths: list,
+    store: str = LEXICON_STORE,
+    verified: Optional[dict] = None,
+) -> Optional[tuple]:
+    """
+    Load (word_data, inflection_map, sources) from a snapshot if it exists,
+    has the current version and was built from the given source files.
+    `store` picks the word_data representation: 'lazy' (LazyWordData over
+    the file), 'compact' (CompactWordData) or 'dict' (plain dicts).
+    `sources` is None when the recorded fingerprints are current, otherwise
+    the current ones (the sources only matched by hash), so the caller can
+    record the new mtimes. Returns None otherwise.
+    """
+    if not os.path.exists(snapshot_path):
+        return None
+
+    try:
+        with open(snapshot_path, 'rb') as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                return None
+            header = pickle.load(f)
+            if header.get('version') != SNAPSHOT_VERSION:
+                return None
+
+            recorded = header.get('sources', [])
+            current = _sources_match(recorded, source_paths, verified)
+            if current is None:
+                return None
+
+            # the index is ~100k small objects
+            with _gc_paused():
+                index = pickle.load(f)
+                data_start = f.tell()
+
+                if store == 'lazy':
+                    word_data = LazyWordData(snapshot_path, data_start, index['words'], index['offsets'])
+                else:
+                    offsets = array('Q')
+                    offsets.frombytes(index['offsets'])
+                    payload = f.read()
+                    entries = (
+                        (word, pickle.loads(payload[offsets[i]:offsets[i + 1]]))
+                        for i, word in enumerate(index['words'])
+                    )
+                    word_data = CompactWordData(entries) if store == 'compact' else dict(entries)
+    except (OSError, EOFError, pickle.UnpicklingError, KeyError, ValueError) as e:
+        logger.warning(f'Ignoring unreadable lexicon snapshot {snapshot_path}: {e}')
+        return None
+
+    return word_data, index['inflection_map'], None if current == recorded else current
+
+
+def build_from_sources(xml_path: str, jsonl_path: str, progress: Optional[Callable] = None) -> tuple:
+    """Parse the Folkets XML and Kaikki JSONL into (word_data, inflection_map)."""
+    with _timed_phase('noun_senses'):
+        noun_senses = build_noun_senses(jsonl_path)
+
+    with _timed_phase('word_data'):
+        word_data = build_word_data(xml_path, noun_senses, progress=progress)
+
+    with _timed_phase('inflection_map'):
+        inflection_map = build_inflection_map(word_data)
+
+    return word_data, inflection_map
+
+
+def build_snapshot(
+    xml_path: str = FOLKETS_XML_PATH,
+    jsonl_path: str = KAIKKI_JSONL_PATH,
+    snapshot_path: str = LEXICON_SNAPSHOT_PATH,
+    progress: Optional[Callable] = None,
+) -> tuple:
+    """
+    Rebuild word_data and inflection_map from source and write a fresh snapshot.
+    Returns (word_data, inflection_map, written).
+    """
+    source_paths = [xml_path, jsonl_path]
+    word_data, inflection_map = build_from_sources(xml_path, jsonl_path, progress=progress)
+
+    try:
+        with _timed_phase('write_snapshot'):
+            sources = [_source_fingerprint(path) for path in source_paths]
+            save_snapshot(snapshot_path, word_data, inflection_map, sources)
+        written = True
+    except OSError as e:
+        logger.warning(f'Could not write lexicon snapshot {snapshot_path}: {e}')
+        written = False
+
+    return word_data, inflection_map, written
+
+
+def load_lexicon(
+    xml_path: str = FOLKETS_XML_PATH,
+    jsonl_path: str = KAIKKI_JSONL_PATH,
+    snapshot_path: str = LEXICON_SNAPSHOT_PATH,
+    store: str = LEXICON_STORE,
+    progress: Optional[Callable] = None,
+    sources_path: str = LEXICON_SOURCES_PATH,
+) -> tuple:
+    """
+    Return (word_data, inflection_map), from the snapshot when it is up to date
+    with the source files, otherwise by parsing the sources and rebuilding it.
+    `store` selects the word_data representation (see load_snapshot); the
+    'lazy' store only materializes entries as they are looked up.
+    """
+    start = time.perf_counter()
+    source_paths = [xml_path, jsonl_path]
+
+    with _timed_phase('load_snapshot'):
+        verified = _load_verified_sources(sources_path)
+        snapshot = load_snapshot(snapshot_path, source_paths, store=store, verified=verified)
+
+    source = 'snapshot' if snapshot else 'xml'
+    if snapshot:
+        word_data, inflection_map, touched = snapshot
+        if touched:
+            # sources were only touched — record the new mtimes so the next
+            # start doesn't hash them again: in the snapshot header, or in
+            # CACHE_DIR when the snapshot is read-only (e.g. bundled)
+            try:
+                _rewrite_snapshot_header(snapshot_path, touched)
+            except OSError:
+                if any(verified.get(os.path.abspath(p)) != fp for p, fp in zip(source_paths, touched)):
+                    _save_verified_sources(sources_path, source_paths, touched)
+    else:
+        word_data, inflection_map, written = build_snapshot(xml_path, jsonl_path, snapshot_path, progress)
+        if store == 'lazy' and written:
+            # reopen lazily so the freshly built dicts can be released
+            snapshot = load_snapshot(snapshot_path, source_paths, store='lazy')
+            if snapshot:
+                word_data, inflection_map, _ = snapshot
+        elif store == 'compact':
+            word_data = CompactWordData(word_data.items())
+
+    if progress:
+        progress(len(word_data))
+
+    _log_event(
+        'lexicon.ready',
+        source=source,
+        words=len(word_data),
+        inflections=len(inflection_map),
+        duration_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+    return word_data, inflection_map
 
 
 # ---------------------------------------------------------------------------
-# Module-level data — loaded once at import time
+# Background loading
 # ---------------------------------------------------------------------------
 
-print('Loading lexicon...')
-_lexicon = build_lexicon(FOLKETS_XML_PATH)
+class Lexicon:
+    """
+    Owns word_data and inflection_map and loads them on a background thread,
+    so the server can answer requests (e.g. /health) while parsing.
+    `status` is 'loading', 'ready' or 'error'. Derived indexes (search, reverse, compounds) are
+    built on the same thread right after the lexicon is ready, so lookups
+    don't wait for them.
+
+    `enrich(word, details) -> details` layers extra data (e.g. cached Claude
+    answers) onto an entry each time it is read through details()/lookup(),
+    without writing it into word_data — a write would pin a lazily loaded
+    entry for good. `enriched_senses(word_data)` yields the
+    (word, definition_index, definition) whose translations enrich changes,
+    so the reverse index can include them.
+    """
+
+    def __init__(self, enrich: Optional[Callable] = None, enriched_senses: Optional[Callable] = None):
+        self.enrich = enrich
+        self.enriched_senses = enriched_senses
+        self.word_data = {}
+        self.inflection_map = {}
+        self.search_index = None
+        self.reverse_index = None
+        self.compound_splitter = None
+        self.status = 'loading'
+        self.error = None
+        self.words_parsed = 0
+        self._started_at = None
+        self._finished_at = None
+        self._ready = threading.Event()
+        self._indexed = threading.Event()
+
+    def _on_progress(self, words_parsed: int):
+        self.words_parsed = words_parsed
+
+    def load(self, **kwargs):
+        """Load synchronously; kwargs are passed through to load_lexicon."""
+        self._started_at = time.perf_counter()
+        try:
+            self.word_data, self.inflection_map = load_lexicon(progress=self._on_progress, **kwargs)
+            self.status = 'ready'
+        except Exception as e:
+            logger.exception('Lexicon failed to load')
+            self.error = str(e)
+            self.status = 'error'
+        finally:
+            self._finished_at = time.perf_counter()
+            self._ready.set()
+
+        if self.ready:
+            self._build_indexes()
+        self._indexed.set()
+
+        # searches don't wait for this; reverse lookups pick the senses up as they land
+        if self.ready and self.reverse_index is not None and self.enriched_senses is not None:
+            self._index_enriched_senses()
+
+    def _build_indexes(self):
+        try:
+            with _timed_phase('search_index'):
+                self.search_index = SearchIndex(self.word_data, self.inflection_map)
+            with _timed_phase('reverse_index'):
+                self.reverse_index = ReverseIndex(self.word_data)
+            with _timed_phase('compound_splitter'):
+                self.compound_splitter = CompoundSplitter(self.word_data, self.inflection_map)
+        except Exception:
+            logger.exception('Search indexes failed to build')
+
+    def _index_enriched_senses(self):
+        try:
+            with _timed_phase('reverse_index_enriched'):
+                for word, i, definition in self.enriched_senses(self.word_data):
+                    self.reverse_index.update(word, i, definition)
+        except Exception:
+            logger.exception('Indexing enriched senses failed')
+
+    def start(self, **kwargs) -> threading.Thread:
+        """Start loading on a daemon thread and return it."""
+        thread = threading.Thread(target=self.load, kwargs=kwargs, name='lexicon-loader', daemon=True)
+        thread.start()
+        return thread
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until loading finishes (or fails). Returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    def wait_until_indexed(self, timeout: Optional[float] = None) -> bool:
+        """Block until the derived indexes are built (or skipped). Returns False on timeout."""
+        return self._indexed.wait(timeout)
+
+    def resolve(self, word: str, index_timeout: Optional[float] = None) -> Optional[tuple]:
+        """
+        Resolve a word to (base_word, compound) without materializing details.
+        Tries the base form, then inflections, then — waiting up to
+        `index_timeout` for the splitter — compound decomposition, in which
+        case `compound` is the split and base_word its head. None if unknown.
+        """
+        if word in self.word_data:
+            return word, None
+
+        base_word = self.inflection_map.get(word)
+        if base_word:
+            return base_word, None
+
+        # only misses pay for waiting on the compound splitter to finish building
+        if self.wait_until_indexed(index_timeout) and self.compound_splitter is not None:
+            compound = self.compound_splitter.decompose(word)
+            if compound:
+                return compound['head'], compound
+
+        return None
+
+    def lookup(self, word: str, index_timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Look up a word by its base form, any inflected form or, failing those,
+        as a compound: returns {base_word: details} where details carry a
+        'compound' key for decomposed words, or None if not found.
+        """
+        resolved = self.resolve(word, index_timeout)
+        if not resolved:
+            return None
+
+        base_word, compound = resolved
+        details = self.details(base_word)
+        if compound:
+            details = {**details, 'compound': compound}
+        return {base_word: details}
+
+    def details(self, word: str) -> dict:
+        """The entry for a base word, with enrich() applied. KeyError if unknown."""
+        details = self.word_data[word]
+        if self.enrich is not None:
+            try:
+                details = self.enrich(word, details)
+            except Exception:
+                logger.exception(f'Enriching "{word}" failed')
+        return details
+
+    @property
+    def ready(self) -> bool:
+        return self.status == 'ready'
+
+    def progress(self) -> dict:
+        """Loading state and counts, cheap enough for every /health call."""
+        if self._started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        return {
+            'lexicon_status': self.status,
+            'words_parsed': self.words_parsed,
+            'words_loaded': len(self.word_data),
+            'inflections_loaded': len(self.inflection_map),
+            'indexes_ready': self._indexed.is_set(),
+            'elapsed_ms': round(elapsed * 1000),
+        }
 
-print('Loading noun senses...')
-_noun_senses = build_noun_senses(KAIKKI_JSONL_PATH)
 
-print('Building word data...')
-word_data = build_word_data(_lexicon, _noun_senses)
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Swedish lexicon tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build-snapshot', help='prebuild the compiled lexicon snapshot')
+    build.add_argument('--xml', default=FOLKETS_XML_PATH)
+    build.add_argument('--jsonl', default=KAIKKI_JSONL_PATH)
+    build.add_argument('--out', default=LEXICON_SNAPSHOT_PATH)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == 'build-snapshot':
+        start = time.perf_counter()
+        word_data, inflection_map, written = build_snapshot(args.xml, args.jsonl, args.out)
+        if not written:
+            raise SystemExit(f'Failed to write snapshot to {args.out}')
+        print(
+            f'Built {len(word_data)} words, {len(inflection_map)} inflections '
+            f'in {time.perf_counter() - start:.2f}s -> {args.out}'
+        )
 
-print('Building inflection map...')
-inflection_map = build_inflection_map(word_data)
 
-print(f'Lexicon ready: {len(word_data)} words, {len(inflection_map)} inflections')
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key             TEXT PRIMARY KEY,
+    kind            TEXT NOT NULL,
+    model           TEXT NOT NULL,
+    prompt_version  INTEGER NOT NULL,
+    word            TEXT NOT NULL,
+    inputs          TEXT NOT NULL,
+    result          TEXT NOT NULL,
+    created_at      REAL NOT NULL,
+    last_used_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_kind_word ON llm_cache (kind, word);
+CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used_at);
+CREATE TABLE IF NOT EXISTS job_progress (
+    job         TEXT NOT NULL,
+    word        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (job, word)
+);
+'''
+
+# run size-based eviction every this many writes
+EVICT_EVERY = 100
+
+
+class LLMCache:
+    """
+    Durable SQLite cache of Claude responses.
+
+    Entries are keyed by kind (e.g. 'improve_translation'), model, prompt
+    template version and the exact input fields, so changing any of them
+    misses instead of returning a stale answer. Entries older than `ttl_days`
+    are dropped, and the least recently used are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, path: str, ttl_days: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, creating the database on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+                    self.evict()
+        return conn
+
+    @staticmethod
+    def make_key(kind: str, model: str, prompt_version: int, word: str, inputs: dict) -> str:
+        payload = json.dumps([kind, model, prompt_version, word, inputs], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, kind: str, model: str, prompt_version: int, word: str, inputs: dict) -> Optional[str]:
+        """Return the cached result, or None on a miss or expired entry."""
+        key = self.make_key(kind, model, prompt_version, word, inputs)
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT result, created_at FROM llm_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if not row:
+                return None
+
+            result, created_at = row
+            now = time.time()
+            if now - created_at > self.ttl_seconds:
+                with conn:
+                    conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                return None
+
+            with conn:
+                conn.execute('UPDATE llm_cache SET last_used_at = ? WHERE key = ?', (now, key))
+            return result
+        except (sqlite3.Error, OSError) as e:
+            print(f'LLM cache read failed: {e}')
+            return None
+
+    def put(self, kind: str, model: str, prompt_version: int, word: str, inputs: dict, result: str):
+        """Store a result, replacing any previous entry for the same key."""
+        key = self.make_key(kind, model, prompt_version, word, inputs)
+        now = time.time()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO llm_cache '
+                    '(key, kind, model, prompt_version, word, inputs, result, created_at, last_used_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, kind, model, prompt_version, word,
+                     json.dumps(inputs, sort_keys=True, ensure_ascii=False), result, now, now)
+                )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self.evict()
+        except (sqlite3.Error, OSError) as e:
+            print(f'LLM cache write failed: {e}')
+
+    def word_entries(self, kind: str, model: str, prompt_version: int, word: str) -> list[tuple[dict, str]]:
+        """
+        Return (inputs, result) for every live entry of a kind for one word —
+        for applying cached answers as lexicon entries are read. Read-only:
+        unlike get(), it doesn't touch last_used_at.
+        """
+        try:
+            rows = self._connect().execute(
+                'SELECT inputs, result FROM llm_cache '
+                'WHERE kind = ? AND word = ? AND model = ? AND prompt_version = ? AND created_at >= ?',
+                (kind, word, model, prompt_version, time.time() - self.ttl_seconds)
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            print(f'LLM cache read failed: {e}')
+            return []
+        return [(json.loads(inputs), result) for inputs, result in rows]
+
+    def entries(self, kind: str, model: str, prompt_version: int):
+        """Yield (word, inputs, result) for every live entry of a kind, in word order."""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                'SELECT word, inputs, result FROM llm_cache '
+                'WHERE kind = ? AND model = ? AND prompt_version = ? AND created_at >= ? '
+                'ORDER BY word',
+                (kind, model, prompt_version, cutoff)
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            print(f'LLM cache read failed: {e}')
+            return
+
+        for word, inputs, result in rows:
+            yield word, json.loads(inputs), result
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (time.time() - self.ttl_seconds,))
+                conn.execute(
+                    'DELETE FROM llm_cache WHERE key IN ('
+                    '  SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?'
+                    ')',
+                    (self.max_entries,)
+                )
+        except (sqlite3.Error, OSError) as e:
+            print(f'LLM cache eviction failed: {e}')
+
+    # -----------------------------------------------------------------------
+    # Job checkpoints (resumable bulk jobs, see enrich.py)
+    # -----------------------------------------------------------------------
+
+    def mark(self, job: str, word: str, status: str):
+        """Record that a bulk job finished `word` with `status` ('done' or 'failed')."""
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO job_progress (job, word, status, updated_at) VALUES (?, ?, ?, ?)',
+                    (job, word, status, time.time())
+                )
+        except (sqlite3.Error, OSError) as e:
+            print(f'Job checkpoint write failed: {e}')
+
+    def completed(self, job: str) -> set:
+        """Return the words a bulk job has already finished successfully."""
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT word FROM job_progress WHERE job = ? AND status = 'done'", (job,)
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            print(f'Job checkpoint read failed: {e}')
+            return set()
+        return {word for (word,) in rows}
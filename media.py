@@ -0,0 +1,133 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import http_client
+from config import ANKI_MEDIA_DIR, IMAGE_MAX_DIMENSION, IMAGE_JPEG_QUALITY, IMAGE_MAX_DOWNLOAD_BYTES
+
+try:
+    from PIL import Image
+except ImportError:  # without Pillow, images are stored as downloaded
+    Image = None
+
+# extension for images kept in their original encoding
+CONTENT_TYPE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg',
+}
+
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='media')
+
+
+def _download_image(url: str) -> tuple[bytes, str]:
+    """Download an image, returning (bytes, content type). Raises ValueError if it isn't one."""
+    response = http_client.get(url, stream=True)
+    response.raise_for_status()
+
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if not content_type.startswith('image/'):
+        response.close()
+        raise ValueError(f'not an image ({content_type or "no content type"})')
+
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(64 * 1024):
+        size += len(chunk)
+        if size > IMAGE_MAX_DOWNLOAD_BYTES:
+            response.close()
+            raise ValueError(f'larger than {IMAGE_MAX_DOWNLOAD_BYTES} bytes')
+        chunks.append(chunk)
+    return b''.join(chunks), content_type
+
+
+def _shrink(data: bytes) -> tuple[bytes, str]:
+    """
+    Downsize to IMAGE_MAX_DIMENSION on the longest side and re-encode as JPEG.
+    Returns (bytes, extension). Vector and animated images are kept as-is.
+    """
+    image = Image.open(io.BytesIO(data))
+    if getattr(image, 'is_animated', False):
+        raise ValueError('animated')
+
+    image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # flatten transparency onto white, JPEG has no alpha
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    out = io.BytesIO()
+    image.save(out, format='JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue(), '.jpg'
+
+
+def _write_local(filename: str, data: bytes):
+    filepath = os.path.join(ANKI_MEDIA_DIR, filename)
+    if not os.path.exists(filepath):
+        tmp_path = f'{filepath}.part'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+
+
+def fetch_image(url: str) -> Optional[tuple[str, bytes]]:
+    """
+    Download one image and shrink it. Returns (filename, bytes) with the
+    file named by its content hash (identical images share one file), or
+    None if the URL isn't a usable image.
+    """
+    try:
+        data, content_type = _download_image(url)
+
+        extension = CONTENT_TYPE_EXTENSIONS.get(content_type)
+        if Image is not None and content_type != 'image/svg+xml':
+            try:
+                data, extension = _shrink(data)
+            except Exception as e:
+                if extension is None:
+                    raise ValueError(f'unreadable image: {e}')
+        if extension is None:
+            raise ValueError(f'unsupported type {content_type}')
+
+        return f'img-{hashlib.sha256(data).hexdigest()[:20]}{extension}', data
+    except Exception as e:
+        print(f'Could not store image {url}: {e}')
+        return None
+
+
+def prepare_images(image_urls: list) -> tuple[list[str], list[tuple[str, bytes]]]:
+    """
+    Download and shrink the chosen images concurrently, writing them into the
+    local Anki media dir when it exists. Returns (srcs, uploads): the image
+    sources for the card HTML (media filenames; an image that can't be fetched
+    or written keeps its remote URL, duplicates dropped) and the (filename, bytes) still
+    to send through AnkiConnect when the media dir isn't local.
+    """
+    fetched = list(_pool.map(fetch_image, image_urls))
+    local = os.path.isdir(ANKI_MEDIA_DIR)
+
+    srcs = []
+    uploads = []
+    for url, image in zip(image_urls, fetched):
+        if image and local:
+            try:
+                _write_local(*image)
+            except OSError as e:
+                print(f'Could not write image {image[0]} to the Anki media dir: {e}')
+                image = None
+        src = image[0] if image else url
+        if src in srcs:
+            continue
+        srcs.append(src)
+        if image and not local:
+            uploads.append(image)
+    return srcs, uploads
+
@@ -0,0 +1,216 @@
+import html
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from anki import _ankiconnect, is_anki_running
+from config import ANKI_NOTE_INDEX_PATH, ANKI_NOTE_INDEX_REFRESH_SECONDS, ANKI_NOTE_INDEX_FULL_SYNC_HOURS
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS anki_notes (
+    note_id  INTEGER NOT NULL,
+    word     TEXT NOT NULL,
+    deck     TEXT NOT NULL,
+    card     TEXT NOT NULL,      -- 'forward', 'reverse' or ''
+    mod      INTEGER,
+    PRIMARY KEY (note_id, word)
+);
+CREATE INDEX IF NOT EXISTS anki_notes_word ON anki_notes (word);
+CREATE TABLE IF NOT EXISTS anki_notes_meta (
+    key    TEXT PRIMARY KEY,
+    value  REAL NOT NULL
+);
+'''
+
+# notes this app creates are tagged 'swedish'
+NOTES_QUERY = 'tag:swedish'
+
+# notes per notesInfo/cardsInfo request
+FETCH_BATCH_SIZE = 500
+
+_TAG = re.compile(r'<[^>]+>')
+_FIRST_DIV = re.compile(r'<div[^>]*>(.*?)</div>', re.S)
+_ARTICLES = ('en/ett ', 'en ', 'ett ')
+
+
+def note_words(field_html: str) -> list[str]:
+    """
+    Recover the Swedish word from the headword div of a card side, which is
+    'hund', 'en hund', 'en/ett hund' or 'hund, en hund' (mixed word classes).
+    Returns the word, plus the raw text when stripping an article changed it
+    (so a phrase like 'en gång' is still found).
+    """
+    match = _FIRST_DIV.search(field_html)
+    text = html.unescape(_TAG.sub('', match.group(1) if match else field_html)).strip().lower()
+    if ', ' in text:
+        return [text.split(', ')[0]]
+    for article in _ARTICLES:
+        if text.startswith(article):
+            return [text[len(article):], text]
+    return [text]
+
+
+class NoteIndex:
+    """
+    Local SQLite index of the notes already in Anki: word -> note ids, deck and
+    card kind (from the forward-card/reverse-card tags), so /lookup can say
+    whether a word is already in a deck without calling AnkiConnect.
+
+    The first sync fetches every note via findNotes/notesInfo in batches.
+    Later syncs are incremental: one multi request lists all note ids and the
+    recently edited ones, deleted notes are dropped, and only new or edited
+    notes are fetched. A full resync runs every `full_sync_hours` to pick up
+    cards moved between decks. Cards created through this app are added
+    directly, without waiting for a sync.
+    """
+
+    def __init__(
+        self,
+        path: str = ANKI_NOTE_INDEX_PATH,
+        refresh_seconds: float = ANKI_NOTE_INDEX_REFRESH_SECONDS,
+        full_sync_hours: float = ANKI_NOTE_INDEX_FULL_SYNC_HOURS,
+    ):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.full_sync_seconds = full_sync_hours * 3600
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- reads ---------------------------------------------------------------
+
+    def lookup(self, word: str) -> dict:
+        """Return {'in_deck': bool, 'in_decks': [deck, ...]} for a word."""
+        try:
+            rows = self._connect().execute(
+                'SELECT DISTINCT deck FROM anki_notes WHERE word = ? ORDER BY deck', (word.lower(),)
+            ).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            print(f'Anki note index read failed: {e}')
+            rows = []
+        decks = [deck for (deck,) in rows]
+        return {'in_deck': bool(decks), 'in_decks': decks}
+
+    # --- writes --------------------------------------------------------------
+
+    def add(self, word: str, deck: str, note_id: int, card: str):
+        """Record a note this app just created."""
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO anki_notes (note_id, word, deck, card, mod) VALUES (?, ?, ?, ?, ?)',
+                    (note_id, word.lower(), deck, card, int(time.time()))
+                )
+        except (sqlite3.Error, OSError) as e:
+            print(f'Anki note index write failed: {e}')
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> float:
+        row = conn.execute('SELECT value FROM anki_notes_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0.0
+
+    def sync(self) -> dict:
+        """Bring the index up to date with Anki. Returns counts of what changed."""
+        with self._sync_lock:
+            conn = self._connect()
+            started = time.time()
+            full = started - self._meta(conn, 'last_full_sync') > self.full_sync_seconds
+            last_sync = self._meta(conn, 'last_sync')
+
+            actions = [{'action': 'findNotes', 'version': 6, 'params': {'query': NOTES_QUERY}}]
+            if not full:
+                # edited:N is in whole days; a day of overlap is cheap
+                days = max(1, math.ceil((started - last_sync) / 86400))
+                actions.append({'action': 'findNotes', 'version': 6,
+                                'params': {'query': f'{NOTES_QUERY} edited:{days}'}})
+            responses = _ankiconnect('multi', actions=actions)
+            for response in responses:
+                if response.get('error'):
+                    raise Exception(response['error'])
+
+            all_ids = set(responses[0]['result'])
+            known = {note_id for (note_id,) in conn.execute('SELECT DISTINCT note_id FROM anki_notes')}
+            deleted = known - all_ids
+            if full:
+                to_fetch = all_ids
+            else:
+                to_fetch = (all_ids - known) | (set(responses[1]['result']) & all_ids)
+
+            rows = []
+            fetch = sorted(to_fetch)
+            for start in range(0, len(fetch), FETCH_BATCH_SIZE):
+                rows.extend(self._fetch_rows(fetch[start:start + FETCH_BATCH_SIZE]))
+
+            with conn:
+                if full:
+                    conn.execute('DELETE FROM anki_notes')
+                else:
+                    conn.executemany('DELETE FROM anki_notes WHERE note_id = ?',
+                                     [(note_id,) for note_id in deleted | to_fetch])
+                conn.executemany(
+                    'INSERT OR REPLACE INTO anki_notes (note_id, word, deck, card, mod) VALUES (?, ?, ?, ?, ?)',
+                    rows
+                )
+                conn.execute('INSERT OR REPLACE INTO anki_notes_meta VALUES (?, ?)', ('last_sync', started))
+                if full:
+                    conn.execute('INSERT OR REPLACE INTO anki_notes_meta VALUES (?, ?)', ('last_full_sync', started))
+
+            return {'full': full, 'notes': len(all_ids), 'fetched': len(to_fetch),
+                    'deleted': 0 if full else len(deleted)}
+
+    def _fetch_rows(self, note_ids: list) -> list[tuple]:
+        """notesInfo + cardsInfo for a batch of notes -> anki_notes rows."""
+        notes = _ankiconnect('notesInfo', notes=note_ids)
+        first_cards = [note['cards'][0] for note in notes if note.get('cards')]
+        decks = {card['note']: card['deckName'] for card in _ankiconnect('cardsInfo', cards=first_cards)}
+
+        rows = []
+        for note in notes:
+            fields = note.get('fields', {})
+            tags = note.get('tags', [])
+            if 'reverse-card' in tags:
+                card, side = 'reverse', fields.get('Back', {}).get('value', '')
+            else:
+                card = 'forward' if 'forward-card' in tags else ''
+                side = fields.get('Front', {}).get('value', '')
+
+            for word in note_words(side):
+                if word:
+                    rows.append((note['noteId'], word, decks.get(note['noteId'], ''), card, note.get('mod')))
+        return rows
+
+    # --- background refresh --------------------------------------------------
+
+    def start(self):
+        """Sync now and then every refresh_seconds on a daemon thread, while Anki is reachable."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='anki-note-index', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if is_anki_running():
+                try:
+                    started = time.perf_counter()
+                    counts = self.sync()
+                    print(f'Anki note index synced in {time.perf_counter() - started:.2f}s: {counts}')
+                except Exception as e:
+                    print(f'Anki note index sync failed: {e}')
+            self._stop.wait(self.refresh_seconds)
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,266 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from config import (
+    OUTBOX_PATH, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_SECONDS, OUTBOX_OFFLINE_BACKOFF_SECONDS, OUTBOX_DONE_TTL_HOURS,
+)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    ticket           TEXT PRIMARY KEY,
+    word             TEXT NOT NULL,
+    card             TEXT NOT NULL,       -- the /create-card request, as JSON
+    status           TEXT NOT NULL,       -- 'pending', 'done' or 'failed'
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    error            TEXT,
+    result           TEXT,                -- the /create-card result once done, as JSON
+    created_at       REAL NOT NULL,
+    updated_at       REAL NOT NULL,
+    next_attempt_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+'''
+
+# Anki errors that won't go away by retrying
+PERMANENT_ERRORS = ('duplicate',)
+
+
+class Outbox:
+    """
+    Durable queue of card requests waiting for Anki.
+
+    enqueue() writes the card (definitions, chosen images, audio path) to
+    SQLite and returns a ticket at once, whether or not Anki is open. A
+    background worker drains due items in batches through `deliver` — a
+    function taking a list of cards and returning one /create-card style
+    result per card, or None when Anki can't be reached (a result marked
+    'unreachable' is left pending the same way). While Anki is
+    unreachable the worker backs off (doubling up to the offline cap);
+    failed cards are retried with their own backoff up to `max_attempts`,
+    except for permanent errors such as duplicates.
+    """
+
+    def __init__(
+        self,
+        path: str = OUTBOX_PATH,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        retry_seconds: float = OUTBOX_RETRY_SECONDS,
+        offline_backoff_seconds: float = OUTBOX_OFFLINE_BACKOFF_SECONDS,
+        done_ttl_hours: float = OUTBOX_DONE_TTL_HOURS,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.offline_backoff_seconds = offline_backoff_seconds
+        self.done_ttl_seconds = done_ttl_hours * 3600
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _item(row: sqlite3.Row) -> dict:
+        return {
+            'ticket': row['ticket'],
+            'word': row['word'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'error': row['error'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'next_attempt_at': row['next_attempt_at'] if row['status'] == 'pending' else None,
+        }
+
+    # --- queue ---------------------------------------------------------------
+
+    def enqueue(self, cards: list) -> list[str]:
+        """Persist cards for delivery. Returns one ticket per card."""
+        now = time.time()
+        tickets = [uuid.uuid4().hex for _ in cards]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT INTO outbox (ticket, word, card, status, created_at, updated_at, next_attempt_at) '
+                "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                [(ticket, card['word'], json.dumps(card, ensure_ascii=False), now, now, now)
+                 for ticket, card in zip(tickets, cards)]
+            )
+        self._wake.set()
+        return tickets
+
+    def get(self, ticket: str) -> Optional[dict]:
+        row = self._connect().execute('SELECT * FROM outbox WHERE ticket = ?', (ticket,)).fetchone()
+        return self._item(row) if row else None
+
+    def items(self, status: Optional[str] = None, limit: int = 100) -> list[dict]:
+        """Queued items, oldest first; pending and failed ones unless `status` is given."""
+        if status:
+            rows = self._connect().execute(
+                'SELECT * FROM outbox WHERE status = ? ORDER BY created_at LIMIT ?', (status, limit)
+            )
+        else:
+            rows = self._connect().execute(
+                "SELECT * FROM outbox WHERE status != 'done' ORDER BY created_at LIMIT ?", (limit,)
+            )
+        return [self._item(row) for row in rows]
+
+    def counts(self) -> dict:
+        counts = {'pending': 0, 'failed': 0, 'done': 0}
+        for status, count in self._connect().execute('SELECT status, COUNT(*) FROM outbox GROUP BY status'):
+            counts[status] = count
+        return counts
+
+    def retry(self, ticket: str) -> bool:
+        """Put a failed item back in the queue. Returns False if there is no such failed item."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            updated = conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, error = NULL, "
+                "updated_at = ?, next_attempt_at = ? WHERE ticket = ? AND status = 'failed'",
+                (now, now, ticket)
+            ).rowcount
+        self._wake.set()
+        return bool(updated)
+
+    def remove(self, ticket: str) -> bool:
+        """Drop a pending or failed item. Returns False if there is no such item."""
+        conn = self._connect()
+        with conn:
+            deleted = conn.execute(
+                "DELETE FROM outbox WHERE ticket = ? AND status != 'done'", (ticket,)
+            ).rowcount
+        return bool(deleted)
+
+    def _due(self) -> list[sqlite3.Row]:
+        return self._connect().execute(
+            "SELECT * FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+            'ORDER BY created_at LIMIT ?', (time.time(), self.batch_size)
+        ).fetchall()
+
+    def _next_due_in(self) -> Optional[float]:
+        row = self._connect().execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'"
+        ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def _record(self, row: sqlite3.Row, result: dict):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            if result.get('success'):
+                conn.execute(
+                    "UPDATE outbox SET status = 'done', attempts = attempts + 1, error = NULL, "
+                    'result = ?, updated_at = ? WHERE ticket = ?',
+                    (json.dumps(result, ensure_ascii=False), now, row['ticket'])
+                )
+                return
+
+            error = result.get('error') or 'Unknown error'
+            attempts = row['attempts'] + 1
+            permanent = any(marker in error.lower() for marker in PERMANENT_ERRORS)
+            if permanent or attempts >= self.max_attempts:
+                conn.execute(
+                    "UPDATE outbox SET status = 'failed', attempts = ?, error = ?, result = ?, "
+                    'updated_at = ? WHERE ticket = ?',
+                    (attempts, error, json.dumps(result, ensure_ascii=False), now, row['ticket'])
+                )
+            else:
+                conn.execute(
+                    'UPDATE outbox SET attempts = ?, error = ?, updated_at = ?, next_attempt_at = ? '
+                    'WHERE ticket = ?',
+                    (attempts, error, now, now + self.retry_seconds * 2 ** (attempts - 1), row['ticket'])
+                )
+
+    def _prune(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM outbox WHERE status = 'done' AND updated_at < ?",
+                (time.time() - self.done_ttl_seconds,)
+            )
+
+    # --- background drain ----------------------------------------------------
+
+    def start(self, deliver: Callable[[list], Optional[list]]):
+        """Drain the queue on a daemon thread through `deliver`."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(deliver,), name='outbox', daemon=True)
+            self._thread.start()
+
+    def _drain(self, deliver: Callable[[list], Optional[list]], batch: list) -> bool:
+        """
+        Deliver one batch and record each card's outcome. If delivering the
+        batch raises, its cards are retried one at a time, so the card that
+        breaks delivery is charged the failure (and ends up failed after
+        max_attempts) instead of holding up the rest.
+        Returns False when Anki is unreachable.
+        """
+        try:
+            results = deliver([json.loads(row['card']) for row in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                print(f'Outbox batch failed ({e}), delivering its cards one at a time')
+                return all(self._drain(deliver, [row]) for row in batch)
+            results = [{'success': False, 'error': str(e)}]
+
+        if results is None:
+            return False
+
+        reachable = True
+        for row, result in zip(batch, results):
+            if result.get('unreachable'):
+                # Anki went away mid-write: not the card's fault, so no attempt is spent
+                reachable = False
+                continue
+            self._record(row, result)
+        delivered = sum(bool(result.get('success')) for result in results)
+        print(f'Outbox delivered {delivered}/{len(batch)} queued cards')
+        return reachable
+
+    def _run(self, deliver: Callable[[list], Optional[list]]):
+        self._prune()
+        offline_backoff = 1.0
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                batch = self._due()
+                if batch:
+                    if self._drain(deliver, batch):
+                        offline_backoff = 1.0
+                    else:
+                        # Anki unreachable: wait it out rather than burning attempts
+                        self._stop.wait(offline_backoff)
+                        offline_backoff = min(offline_backoff * 2, self.offline_backoff_seconds)
+                    continue
+            except Exception as e:
+                print(f'Outbox drain failed: {e}')
+                self._stop.wait(self.retry_seconds)
+                continue
+
+            next_due = self._next_due_in()
+            self._wake.wait(next_due if next_due is not None else None)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
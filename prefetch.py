@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+class Prefetcher:
+    """
+    Short-lived in-process cache of speculative fetches.
+
+    prefetch(word) starts every fetcher (e.g. audio, images) for a word in the
+    background; get(kind, word) attaches to that in-flight or finished work
+    instead of starting a new request, and falls back to calling the fetcher
+    directly on a miss. Starting a new word cancels the previous words'
+    fetches that haven't begun yet. At most `max_workers` fetches run at once,
+    at most `max_words` words are held, and entries expire after `ttl_seconds`.
+    Only successful, non-empty results are kept: a fetch that fails or finds
+    nothing is dropped when it completes, so the next request tries again.
+    """
+
+    def __init__(self, fetchers: dict, max_workers: int, ttl_seconds: float, max_words: int):
+        self.fetchers = fetchers
+        self.ttl_seconds = ttl_seconds
+        self.max_words = max_words
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        # word -> (started_at, {kind: future}), oldest first
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        for word in [w for w, (started, _) in self._entries.items() if now - started > self.ttl_seconds]:
+            del self._entries[word]
+        while len(self._entries) > self.max_words:
+            _, futures = self._entries.pop(next(iter(self._entries)))
+            for future in futures.values():
+                future.cancel()
+
+    def prefetch(self, word: str):
+        """Start background fetches for `word`, cancelling queued ones for other words."""
+        now = time.monotonic()
+        with self._lock:
+            for other, (started, futures) in list(self._entries.items()):
+                if other == word:
+                    continue
+                # running fetches can't be stopped; keep them so a late request can still attach
+                for kind, future in list(futures.items()):
+                    if future.cancel():
+                        del futures[kind]
+                if not futures:
+                    del self._entries[other]
+
+            self._expire(now)
+            started, futures = self._entries.setdefault(word, (now, {}))
+            submitted = []
+            for kind, fetch in self.fetchers.items():
+                if kind not in futures:
+                    futures[kind] = self._executor.submit(fetch, word)
+                    submitted.append((kind, futures[kind]))
+
+        # outside the lock: a fetch that has already finished runs its callback
+        # right here, and _drop_failed takes the lock
+        for kind, future in submitted:
+            future.add_done_callback(lambda f, kind=kind: self._drop_failed(word, kind, f))
+
+    def _drop_failed(self, word: str, kind: str, future):
+        """Forget a fetch that raised or came back empty (requests already waiting still get it)."""
+        if future.cancelled() or (future.exception() is None and future.result()):
+            return
+        with self._lock:
+            entry = self._entries.get(word)
+            if entry and entry[1].get(kind) is future:
+                del entry[1][kind]
+
+    def get(self, kind: str, word: str):
+        """Return the prefetched result for (kind, word), or fetch it now on a miss."""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(word)
+            future = entry[1].get(kind) if entry else None
+
+        if future is not None:
+            try:
+                return future.result()
+            except CancelledError:
+                pass
+
+        return self.fetchers[kind](word)
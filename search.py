@@ -0,0 +1,435 @@
+import argparse
+import heapq
+import math
+import random
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Optional
+
+# ---------------------------------------------------------------------------
+# Normalization
+# ---------------------------------------------------------------------------
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics, so 'Björn', 'bjorn' and 'BJÖRN' all match."""
+    decomposed = unicodedata.normalize('NFKD', text.lower().strip())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+# ---------------------------------------------------------------------------
+# Edit distance
+# ---------------------------------------------------------------------------
+
+def _distance_upto_one(a: str, b: str) -> int:
+    """Linear-time edit_distance for max_distance=1: returns 0, 1 or 2 (= more)."""
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return 2
+
+    # skip the common prefix, then compare what's left after one edit
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+
+    if len(a) == len(b):
+        if a[i + 1:] == b[i + 1:]:
+            return 1  # substitution
+        if i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]:
+            return 1  # adjacent transposition
+        return 2
+
+    return 1 if a[i:] == b[i + 1:] else 2  # insertion
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein + adjacent transpositions).
+    Gives up early and returns max_distance + 1 once the bound is exceeded.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if max_distance == 1:
+        return _distance_upto_one(a, b)
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, prev_prev[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, current
+
+    return prev[-1]
+
+
+def _deletes(term: str, max_distance: int) -> set:
+    """All strings reachable from `term` by deleting up to max_distance characters."""
+    result = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for candidate in frontier:
+            if len(candidate) <= 1:
+                continue
+            for i in range(len(candidate)):
+                next_frontier.add(candidate[:i] + candidate[i + 1:])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class SearchIndex:
+    """
+    Prefix and typo-tolerant search over every base form and inflection.
+
+    - Prefix completion: folded terms bucketed by length, each bucket sorted
+      and searched with bisect, so the shortest completions come first.
+    - Fuzzy matching: a SymSpell-style deletion index. Every term's first
+      `prefix_length` folded characters are expanded into their deletions up
+      to `max_distance`; a query expands the same way, and candidates sharing
+      a deletion are verified with a bounded edit distance.
+    - Diacritic folding on both sides, so a missing å/ä/ö costs nothing.
+    """
+
+    def __init__(self, word_data, inflection_map: dict, max_distance: int = 1, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+
+        # folded term -> [(term, base word)]; several terms can fold together
+        self._terms = {}
+        for term, base in inflection_map.items():
+            self._add_term(term, base)
+        for word in word_data:
+            self._add_term(word, word)
+
+        # length -> sorted folded terms of that length
+        self._by_length = {}
+        for folded in sorted(self._terms):
+            self._by_length.setdefault(len(folded), []).append(folded)
+        self._lengths = sorted(self._by_length)
+
+        self._deletions = {}
+        for folded in self._terms:
+            for deletion in _deletes(folded[:prefix_length], max_distance):
+                bucket = self._deletions.get(deletion)
+                if bucket is None:
+                    self._deletions[deletion] = folded
+                elif isinstance(bucket, str):
+                    self._deletions[deletion] = [bucket, folded]
+                else:
+                    bucket.append(folded)
+
+    def _add_term(self, term: str, base: str):
+        if not term:
+            return
+        entries = self._terms.setdefault(fold(term), [])
+        if (term, base) not in entries:
+            entries.append((term, base))
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def prefix(self, query: str, limit: int = 10) -> list[str]:
+        """Return up to `limit` folded terms starting with the folded query, shortest first."""
+        folded = fold(query)
+        if not folded:
+            return []
+
+        # one bisect per length, shortest first: a short prefix with thousands
+        # of completions only reads the `limit` it returns
+        matches = []
+        for length in self._lengths[bisect_left(self._lengths, len(folded)):]:
+            terms = self._by_length[length]
+            i = bisect_left(terms, folded)
+            while i < len(terms) and terms[i].startswith(folded):
+                matches.append(terms[i])
+                if len(matches) == limit:
+                    return matches
+                i += 1
+        return matches
+
+    def fuzzy(self, query: str, limit: int = 10, max_distance: Optional[int] = None) -> list[tuple[str, int]]:
+        """Return up to `limit` (folded term, distance) pairs within max_distance edits."""
+        folded = fold(query)
+        if not folded:
+            return []
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+
+        candidates = set()
+        for deletion in _deletes(folded[:self.prefix_length], max_distance):
+            bucket = self._deletions.get(deletion)
+            if bucket is None:
+                continue
+            if isinstance(bucket, str):
+                candidates.add(bucket)
+            else:
+                candidates.update(bucket)
+
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(folded, candidate, max_distance)
+            if distance <= max_distance:
+                scored.append((candidate, distance))
+
+        scored.sort(key=lambda c: (c[1], len(c[0]), c[0]))
+        return scored[:limit]
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Combined search: exact (folded) hits first, then prefix completions,
+        then fuzzy matches by edit distance. Each result names the matched term
+        and the base word it resolves to.
+        """
+        folded = fold(query)
+        if not folded:
+            return []
+
+        ranked = []
+        seen = set()
+
+        def add(folded_term: str, match: str, distance: int):
+            if folded_term in seen:
+                return
+            seen.add(folded_term)
+            for term, base in self._terms[folded_term]:
+                ranked.append({'word': term, 'base': base, 'match': match, 'distance': distance})
+
+        if folded in self._terms:
+            add(folded, 'exact', 0)
+        for folded_term in self.prefix(folded, limit=limit):
+            add(folded_term, 'prefix', 0)
+        if len(ranked) < limit:
+            for folded_term, distance in self.fuzzy(folded, limit=limit):
+                add(folded_term, 'fuzzy', distance)
+
+        return ranked[:limit]
+
+
+# ---------------------------------------------------------------------------
+# Reverse (English -> Swedish) index
+# ---------------------------------------------------------------------------
+
+_ENGLISH_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_ENGLISH_STOPWORDS = {
+    'a', 'an', 'the', 'to', 'of', 'and', 'or', 'in', 'on', 'at', 'for', 'by',
+    'with', 'be', 'is', 'sb', 'sth', 'something', 'somebody', 'someone', 'etc',
+}
+
+
+def _normalize_english_token(token: str) -> str:
+    """Very light stemming so 'dogs'/'dog' and 'berries'/'berry' meet."""
+    if token.endswith("'s"):
+        token = token[:-2]
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize_english(text: str) -> list[str]:
+    """Lowercase, fold, split and stem an English phrase, dropping stopwords."""
+    tokens = []
+    for token in _ENGLISH_TOKEN.findall(fold(text)):
+        token = _normalize_english_token(token)
+        if token and token not in _ENGLISH_STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def _english_phrases(text: str) -> set:
+    """Split a translation like 'dog, hound' into normalized phrases for exact matching."""
+    phrases = set()
+    for phrase in re.split(r'[,;/]', text or ''):
+        tokens = tokenize_english(phrase)
+        if tokens:
+            phrases.add(' '.join(tokens))
+    return phrases
+
+
+class ReverseIndex:
+    """
+    Inverted index from English translation tokens to (word, definition_index).
+
+    Both the Folkets `translation` and any `improved_translation` are indexed.
+    Results are ranked by idf-weighted token overlap, scaled by how much of
+    the translation the query covers, with a bonus when the query equals one
+    of the comma-separated alternatives exactly. `update()` re-indexes a
+    single definition, e.g. after /improve-translation.
+    """
+
+    EXACT_BONUS = 2.0
+
+    def __init__(self, word_data):
+        # token -> {(word, definition_index)}
+        self._postings = {}
+        # (word, definition_index) -> (tokens, phrases)
+        self._docs = {}
+        self._lock = threading.Lock()
+
+        for word, details in word_data.items():
+            for i, definition in enumerate(details['definitions']):
+                self._add(word, i, definition)
+
+    @staticmethod
+    def _texts(definition: dict) -> list[str]:
+        return [t for t in (definition.get('translation'), definition.get('improved_translation')) if t]
+
+    def _add(self, word: str, definition_index: int, definition: dict):
+        tokens = set()
+        phrases = set()
+        for text in self._texts(definition):
+            tokens.update(tokenize_english(text))
+            phrases |= _english_phrases(text)
+        if not tokens:
+            return
+
+        key = (word, definition_index)
+        self._docs[key] = (frozenset(tokens), frozenset(phrases))
+        for token in tokens:
+            self._postings.setdefault(token, set()).add(key)
+
+    def _remove(self, word: str, definition_index: int):
+        key = (word, definition_index)
+        doc = self._docs.pop(key, None)
+        if not doc:
+            return
+        for token in doc[0]:
+            postings = self._postings.get(token)
+            if postings:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[token]
+
+    def update(self, word: str, definition_index: int, definition: dict):
+        """Re-index one definition after its translation changed."""
+        with self._lock:
+            self._remove(word, definition_index)
+            self._add(word, definition_index, definition)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def lookup(self, english: str, limit: int = 10) -> list[tuple[str, int, float]]:
+        """Return up to `limit` (word, definition_index, score), best first."""
+        query_tokens = set(tokenize_english(english))
+        if not query_tokens:
+            return []
+        query_phrase = ' '.join(tokenize_english(english))
+
+        with self._lock:
+            total = len(self._docs) or 1
+            weights = {}
+            candidates = set()
+            for token in query_tokens:
+                postings = self._postings.get(token)
+                if postings:
+                    weights[token] = math.log(1 + total / len(postings))
+                    candidates |= postings
+
+            scored = []
+            for key in candidates:
+                tokens, phrases = self._docs[key]
+                matched = query_tokens & tokens
+                overlap = sum(weights[t] for t in matched)
+                # prefer translations the query covers fully ('dog' over 'dog collar')
+                score = overlap * len(matched) / len(tokens | query_tokens)
+                if query_phrase in phrases:
+                    score += self.EXACT_BONUS
+                scored.append((key[0], key[1], round(score, 4)))
+
+        return heapq.nsmallest(limit, scored, key=lambda r: (-r[2], len(r[0]), r[0], r[1]))
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _typo(word: str, rng: random.Random) -> str:
+    """Apply one random edit (drop, swap, replace, strip diacritics) to a word."""
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word) - 1)
+    kind = rng.choice(['drop', 'swap', 'replace', 'fold'])
+    if kind == 'drop':
+        return word[:i] + word[i + 1:]
+    if kind == 'swap':
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == 'replace':
+        return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyzåäö') + word[i + 1:]
+    return fold(word)
+
+
+def benchmark(index: SearchIndex, words: list, queries: int = 5000, seed: int = 0) -> dict:
+    """Time index.search over a mix of exact, prefix and misspelled queries."""
+    rng = random.Random(seed)
+    sample = []
+    for _ in range(queries):
+        word = rng.choice(words)
+        kind = rng.choice(['exact', 'prefix', 'typo'])
+        if kind == 'prefix':
+            sample.append(word[:max(2, len(word) // 2)])
+        elif kind == 'typo':
+            sample.append(_typo(word, rng))
+        else:
+            sample.append(word)
+
+    timings = []
+    for query in sample:
+        start = time.perf_counter()
+        index.search(query)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+
+    def percentile(p: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+
+    return {
+        'queries': len(timings),
+        'p50_ms': round(percentile(0.50), 3),
+        'p90_ms': round(percentile(0.90), 3),
+        'p99_ms': round(percentile(0.99), 3),
+        'max_ms': round(timings[-1] * 1000, 3),
+    }
+
+
+def main():
+    from lexicon import load_lexicon
+
+    parser = argparse.ArgumentParser(description='Benchmark the lexicon search index')
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+
+    word_data, inflection_map = load_lexicon()
+
+    start = time.perf_counter()
+    index = SearchIndex(word_data, inflection_map)
+    build_s = time.perf_counter() - start
+    print(f'Indexed {len(index)} folded terms in {build_s:.2f}s')
+
+    words = list(word_data) + list(inflection_map)
+    print(benchmark(index, words, queries=args.queries))
+
+
+if __name__ == '__main__':
+    main()
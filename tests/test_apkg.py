@@ -0,0 +1,124 @@
+"""
+apkg.py: build a small package offline and read it back with sqlite3.
+"""
+import json
+import os
+import sqlite3
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import apkg  # noqa: E402
+from config import ANKI_MODEL_NAME  # noqa: E402
+
+CARDS = [
+    {
+        'word': 'hund', 'article': 'en hund', 'deck': 'Swedish::Djur', 'create_reverse': True,
+        'definitions': [{'class': 'substantiv', 'translation': 'dog', 'definition': 'ett husdjur',
+                         'phonetic': 'hon:d', 'inflections': ['hunden', 'hundar']}],
+    },
+    {
+        'word': 'springa', 'deck': 'Swedish',
+        'definitions': [{'class': 'verb', 'translation': 'run', 'definition': 'förflytta sig snabbt'}],
+    },
+]
+
+
+def _export(tmp_path, name: str) -> str:
+    audio = tmp_path / 'hund.mp3'
+    audio.write_bytes(b'ID3 fake audio')
+    image = tmp_path / 'img-hund.jpg'
+    image.write_bytes(b'\xff\xd8 fake jpeg')
+
+    cards = json.loads(json.dumps(CARDS))
+    cards[0]['audio_path'] = str(audio)
+    cards[0]['image_urls'] = [str(image)]
+
+    path = str(tmp_path / name)
+    assert apkg.export_cards(cards, path) == 3
+    return path
+
+
+def _open_collection(path: str, tmp_path, name: str):
+    with zipfile.ZipFile(path) as package:
+        package.extract('collection.anki2', tmp_path / name)
+        media = json.loads(package.read('media'))
+        files = {entry: package.read(entry) for entry in media}
+    return sqlite3.connect(tmp_path / name / 'collection.anki2'), media, files
+
+
+@pytest.fixture
+def package(tmp_path):
+    path = _export(tmp_path, 'Swedish.apkg')
+    conn, media, files = _open_collection(path, tmp_path, 'unzipped')
+    yield conn, media, files
+    conn.close()
+
+
+def test_collection_has_the_model_and_decks(package):
+    conn, _, _ = package
+    ver, models, decks = conn.execute('SELECT ver, models, decks FROM col').fetchone()
+    assert ver == 11
+
+    models = json.loads(models)
+    assert len(models) == 1
+    model = next(iter(models.values()))
+    assert model['name'] == ANKI_MODEL_NAME
+    assert [f['name'] for f in model['flds']] == ['Front', 'Back']
+    assert str(model['id']) in models
+
+    names = {deck['name']: int(deck_id) for deck_id, deck in json.loads(decks).items()}
+    assert set(names) == {'Default', 'Swedish', 'Swedish::Djur'}
+
+    card_decks = {did for (did,) in conn.execute('SELECT did FROM cards')}
+    assert card_decks == {names['Swedish'], names['Swedish::Djur']}
+
+
+def test_notes_have_fields_tags_and_guids(package):
+    conn, _, _ = package
+    rows = conn.execute('SELECT guid, mid, tags, flds, sfld FROM notes ORDER BY id').fetchall()
+    assert len(rows) == 3
+    assert conn.execute('SELECT COUNT(*) FROM cards').fetchone()[0] == 3
+
+    models = json.loads(conn.execute('SELECT models FROM col').fetchone()[0])
+    assert {mid for _, mid, _, _, _ in rows} == {int(model_id) for model_id in models}
+
+    guids = [guid for guid, _, _, _, _ in rows]
+    assert guids == [
+        apkg.note_guid('hund', 'forward'),
+        apkg.note_guid('hund', 'reverse'),
+        apkg.note_guid('springa', 'forward'),
+    ]
+
+    _, _, tags, fields, sort_field = rows[0]
+    front, back = fields.split(apkg.FIELD_SEPARATOR)
+    assert 'hund' in front and 'hund' in sort_field
+    assert 'dog' in back and 'ett husdjur' in back
+    assert '[sound:hund.mp3]' in fields
+    assert 'img-hund.jpg' in fields
+    assert 'swedish' in tags.split()
+
+
+def test_media_map_points_at_the_packaged_files(package):
+    _, media, files = package
+    assert sorted(media.values()) == ['hund.mp3', 'img-hund.jpg']
+    by_name = {name: files[entry] for entry, name in media.items()}
+    assert by_name['hund.mp3'] == b'ID3 fake audio'
+    assert by_name['img-hund.jpg'] == b'\xff\xd8 fake jpeg'
+
+
+def test_reexport_keeps_guids_and_ids(tmp_path):
+    first, _, _ = _open_collection(_export(tmp_path, 'a.apkg'), tmp_path, 'a')
+    second, _, _ = _open_collection(_export(tmp_path, 'b.apkg'), tmp_path, 'b')
+
+    query = 'SELECT guid FROM notes ORDER BY id'
+    assert first.execute(query).fetchall() == second.execute(query).fetchall()
+    assert json.loads(first.execute('SELECT models FROM col').fetchone()[0]).keys() == \
+        json.loads(second.execute('SELECT models FROM col').fetchone()[0]).keys()
+    assert json.loads(first.execute('SELECT decks FROM col').fetchone()[0]).keys() == \
+        json.loads(second.execute('SELECT decks FROM col').fetchone()[0]).keys()
+    first.close()
+    second.close()
@@ -0,0 +1,179 @@
+"""
+enrich.py against a local fake Anthropic endpoint: no tokens are spent.
+
+The fake answers a batch prompt ("JSON array of N strings") with N strings
+and a single-sense prompt with one line, and rejects any prompt mentioning
+a word in `FakeAnthropic.failing`.
+"""
+import _thread
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeAnthropic(BaseHTTPRequestHandler):
+    prompts = []
+    failing = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][0]['content']
+        with self.lock:
+            self.prompts.append(prompt)
+
+        if any(f'"{word}"' in prompt for word in self.failing):
+            self._reply(400, {'type': 'error', 'error': {'type': 'invalid_request_error', 'message': 'rejected'}})
+            return
+
+        batch = re.search(r'JSON array of (\d+) strings', prompt)
+        word = re.search(r'Word: "([^"]+)"', prompt).group(1)
+        kind = 'def' if 'dictionary editor' in prompt else 'tr'
+        if batch:
+            text = json.dumps([f'{kind}:{word}:{i}' for i in range(int(batch.group(1)))])
+        else:
+            text = f'{kind}:{word}'
+        self._reply(200, {
+            'id': 'msg_test', 'type': 'message', 'role': 'assistant', 'model': body['model'],
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn', 'stop_sequence': None,
+            'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': 5},
+        })
+
+    def _reply(self, status: int, payload: dict):
+        out = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+# the Anthropic client and the LLM cache are created at import, so point
+# them at the fake and a scratch directory first
+_server = ThreadingHTTPServer(('127.0.0.1', 0), FakeAnthropic)
+threading.Thread(target=_server.serve_forever, daemon=True).start()
+os.environ['ANTHROPIC_BASE_URL'] = f'http://127.0.0.1:{_server.server_address[1]}'
+os.environ['ANTHROPIC_API_KEY'] = 'test-key'
+os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='enrich-test-')
+
+import enrich  # noqa: E402
+import translation  # noqa: E402
+from config import CLAUDE_MODEL  # noqa: E402
+from llm_cache import LLMCache  # noqa: E402
+
+
+def _sense(translation_text: str) -> dict:
+    return {'class': 'substantiv', 'translation': translation_text, 'synonyms': [], 'example': ''}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path / 'llm_cache.sqlite3'), ttl_days=365, max_entries=100000)
+    monkeypatch.setattr(translation, 'cache', cache)
+    monkeypatch.setattr(enrich, 'cache', cache)
+    FakeAnthropic.prompts.clear()
+    FakeAnthropic.failing.clear()
+    return cache
+
+
+def test_senses_are_batched_and_cached(fresh_cache):
+    word_data = {'lag': {'definitions': [_sense('law'), _sense('team'), _sense('layer')]}}
+
+    totals = enrich.run(word_data, ['lag'], concurrency=2)
+
+    assert totals == {'words': 1, 'definitions': 3, 'failed': 0}
+    # one batched call for the translations, one for the definitions
+    assert len(FakeAnthropic.prompts) == 2
+
+    improved = fresh_cache.word_entries(
+        'improve_translation', CLAUDE_MODEL, translation.IMPROVE_PROMPT_VERSION, 'lag')
+    defined = fresh_cache.word_entries(
+        'generate_definition', CLAUDE_MODEL, translation.DEFINITION_PROMPT_VERSION, 'lag')
+    assert sorted(result for _, result in improved) == ['tr:lag:0', 'tr:lag:1', 'tr:lag:2']
+    assert sorted(result for _, result in defined) == ['def:lag:0', 'def:lag:1', 'def:lag:2']
+
+    # the lexicon entry itself is left alone; the server reads answers from the cache
+    assert 'improved_translation' not in word_data['lag']['definitions'][0]
+
+
+def test_checkpointed_words_are_skipped_on_resume(fresh_cache):
+    word_data = {'hund': {'definitions': [_sense('dog')]}, 'katt': {'definitions': [_sense('cat')]}}
+
+    enrich.run(word_data, ['hund'], concurrency=2)
+    assert fresh_cache.completed(enrich.JOB_NAME) == {'hund'}
+    FakeAnthropic.prompts.clear()
+
+    totals = enrich.run(word_data, ['hund', 'katt'], concurrency=2)
+
+    assert totals['words'] == 1
+    assert all('"katt"' in prompt for prompt in FakeAnthropic.prompts)
+    assert fresh_cache.completed(enrich.JOB_NAME) == {'hund', 'katt'}
+
+
+def test_failed_words_are_retried_on_the_next_run(fresh_cache):
+    word_data = {'trasig': {'definitions': [_sense('broken')]}, 'hel': {'definitions': [_sense('whole')]}}
+    FakeAnthropic.failing.add('trasig')
+
+    totals = enrich.run(word_data, ['trasig', 'hel'], concurrency=2)
+    assert totals == {'words': 1, 'definitions': 1, 'failed': 1}
+    assert fresh_cache.completed(enrich.JOB_NAME) == {'hel'}
+
+    FakeAnthropic.failing.clear()
+    totals = enrich.run(word_data, ['trasig', 'hel'], concurrency=2)
+    assert totals == {'words': 1, 'definitions': 1, 'failed': 0}
+    assert fresh_cache.completed(enrich.JOB_NAME) == {'hel', 'trasig'}
+
+
+def test_interrupt_stops_after_the_words_in_flight(fresh_cache, monkeypatch):
+    words = [f'ord{i}' for i in range(100)]
+    word_data = {word: {'definitions': [_sense(word)]} for word in words}
+    started = []
+
+    def slow_enrich(word, details):
+        started.append(word)
+        if len(started) == 5:
+            _thread.interrupt_main()
+        time.sleep(0.02)
+        return 0
+
+    monkeypatch.setattr(enrich, 'enrich_word', slow_enrich)
+
+    with pytest.raises(KeyboardInterrupt):
+        enrich.run(word_data, words, concurrency=2)
+
+    window = enrich.WINDOW_PER_WORKER * 2
+    assert len(started) <= 5 + window
+    # every word that ran to completion was checkpointed before stopping
+    assert fresh_cache.completed(enrich.JOB_NAME) == set(started)
+
+
+def test_done_words_whose_answers_were_evicted_are_enriched_again(fresh_cache):
+    word_data = {'hund': {'definitions': [_sense('dog')]}, 'katt': {'definitions': [_sense('cat')]}}
+    enrich.run(word_data, ['hund', 'katt'], concurrency=2)
+    assert fresh_cache.completed(enrich.JOB_NAME) == {'hund', 'katt'}
+
+    # as LRU eviction or the TTL would
+    conn = fresh_cache._connect()
+    with conn:
+        conn.execute("DELETE FROM llm_cache WHERE word = 'hund'")
+    FakeAnthropic.prompts.clear()
+
+    totals = enrich.run(word_data, ['hund', 'katt'], concurrency=2)
+
+    assert totals == {'words': 1, 'definitions': 1, 'failed': 0}
+    assert FakeAnthropic.prompts and all('"hund"' in prompt for prompt in FakeAnthropic.prompts)
+    enriched = translation.apply_cached_answers('hund', word_data['hund'])
+    assert enriched['definitions'][0]['definition'] == 'def:hund'
@@ -0,0 +1,126 @@
+"""
+Snapshot staleness checks in lexicon.py, on a tiny hand-written snapshot
+(the sources are never parsed while the snapshot matches them).
+"""
+import gc
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexicon  # noqa: E402
+
+WORD_DATA = {'hund': {'definitions': [{'class': 'substantiv', 'translation': 'dog'}]}}
+INFLECTION_MAP = {'hunden': 'hund'}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    xml_path = tmp_path / 'folkets.xml'
+    jsonl_path = tmp_path / 'kaikki.jsonl'
+    xml_path.write_text('<dictionary/>')
+    jsonl_path.write_text('{}\n')
+    paths = [str(xml_path), str(jsonl_path)]
+
+    snapshot_path = str(tmp_path / 'lexicon.snapshot')
+    lexicon.save_snapshot(snapshot_path, WORD_DATA, INFLECTION_MAP,
+                          [lexicon._source_fingerprint(path) for path in paths])
+    return paths, snapshot_path
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    hashed = []
+    file_hash = lexicon._file_hash
+
+    def counting_hash(path):
+        hashed.append(path)
+        return file_hash(path)
+
+    monkeypatch.setattr(lexicon, '_file_hash', counting_hash)
+    return hashed
+
+
+def _read_only(*args):
+    raise PermissionError('read-only bundle')
+
+
+def _touch(paths):
+    for path in paths:
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def _load(paths, snapshot_path, sources_path):
+    return lexicon.load_lexicon(paths[0], paths[1], snapshot_path, store='dict', sources_path=sources_path)
+
+
+def test_touched_sources_are_hashed_once(sources, hashes, tmp_path):
+    paths, snapshot_path = sources
+    sources_path = str(tmp_path / 'cache' / 'lexicon_sources.json')
+    _touch(paths)
+
+    word_data, _ = _load(paths, snapshot_path, sources_path)
+    assert word_data == WORD_DATA
+    assert sorted(hashes) == sorted(paths)
+
+    # the header was rewritten with the new mtimes
+    hashes.clear()
+    _load(paths, snapshot_path, sources_path)
+    assert hashes == []
+    assert not os.path.exists(sources_path)
+
+
+def test_read_only_snapshot_records_fingerprints_in_cache_dir(sources, hashes, tmp_path, monkeypatch):
+    paths, snapshot_path = sources
+    sources_path = str(tmp_path / 'cache' / 'lexicon_sources.json')
+    monkeypatch.setattr(lexicon, '_rewrite_snapshot_header', _read_only)
+    _touch(paths)
+
+    word_data, _ = _load(paths, snapshot_path, sources_path)
+    assert word_data == WORD_DATA
+    assert sorted(hashes) == sorted(paths)
+    assert os.path.exists(sources_path)
+
+    hashes.clear()
+    word_data, _ = _load(paths, snapshot_path, sources_path)
+    assert word_data == WORD_DATA
+    assert hashes == []
+
+
+def test_changed_source_is_not_trusted_from_cache_dir(sources, tmp_path, monkeypatch):
+    paths, snapshot_path = sources
+    sources_path = str(tmp_path / 'cache' / 'lexicon_sources.json')
+    monkeypatch.setattr(lexicon, '_rewrite_snapshot_header', _read_only)
+    _touch(paths)
+    _load(paths, snapshot_path, sources_path)
+
+    # same size, different content, new mtime
+    with open(paths[0], 'w') as f:
+        f.write('<dictionarY/>')
+    _touch(paths[:1])
+
+    verified = lexicon._load_verified_sources(sources_path)
+    assert lexicon.load_snapshot(snapshot_path, paths, store='dict', verified=verified) is None
+
+
+def test_gc_is_only_paused_on_the_main_thread():
+    with pytest.raises(ValueError):
+        with lexicon._gc_paused():
+            assert not gc.isenabled()
+            raise ValueError('unreadable snapshot')
+    assert gc.isenabled()
+
+    seen = []
+
+    def background_load():
+        with lexicon._gc_paused():
+            seen.append(gc.isenabled())
+
+    thread = threading.Thread(target=background_load)
+    thread.start()
+    thread.join()
+    assert seen == [True]
@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prefetch import Prefetcher  # noqa: E402
+
+
+def _prefetcher(fetchers: dict) -> Prefetcher:
+    return Prefetcher(fetchers, max_workers=2, ttl_seconds=60, max_words=10)
+
+
+def _run_with_timeout(fn, seconds: float = 5):
+    done = threading.Event()
+    result = {}
+
+    def target():
+        result['value'] = fn()
+        done.set()
+
+    threading.Thread(target=target, daemon=True).start()
+    assert done.wait(seconds), 'prefetcher deadlocked'
+    return result.get('value')
+
+
+def test_instant_empty_result_does_not_deadlock():
+    prefetcher = _prefetcher({'audio': lambda word: None})
+
+    def run():
+        for i in range(50):
+            prefetcher.prefetch(f'ord{i}')
+            # give the fetch time to finish before the next prefetch registers callbacks
+            time.sleep(0.001)
+        return prefetcher.get('audio', 'ord49')
+
+    assert _run_with_timeout(run) is None
+
+
+def test_empty_and_failed_results_are_refetched():
+    calls = []
+
+    def audio(word):
+        calls.append(word)
+        return None
+
+    def images(word):
+        raise OSError('offline')
+
+    prefetcher = _prefetcher({'audio': audio, 'images': images})
+    prefetcher.prefetch('hund')
+    time.sleep(0.1)
+
+    assert _run_with_timeout(lambda: prefetcher.get('audio', 'hund')) is None
+    # the empty prefetch was dropped, so get() fetched again
+    assert calls == ['hund', 'hund']
+    assert 'images' not in prefetcher._entries['hund'][1]
+
+
+def test_successful_results_are_reused():
+    calls = []
+
+    def audio(word):
+        calls.append(word)
+        return f'{word}.mp3'
+
+    prefetcher = _prefetcher({'audio': audio})
+    prefetcher.prefetch('hund')
+
+    assert prefetcher.get('audio', 'hund') == 'hund.mp3'
+    assert prefetcher.get('audio', 'hund') == 'hund.mp3'
+    assert calls == ['hund']
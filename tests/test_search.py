@@ -0,0 +1,18 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchIndex  # noqa: E402
+
+
+def test_prefix_returns_the_shortest_completions_overall():
+    # 100 long completions sort before the short ones, well past limit * 5
+    long_words = [f'saa{i:03d}xxxxxx' for i in range(100)]
+    word_data = {word: {} for word in long_words + ['sol', 'sz', 'smör']}
+    index = SearchIndex(word_data, {'solen': 'sol'})
+
+    # terms are returned folded
+    assert index.prefix('s', limit=3) == ['sz', 'sol', 'smor']
+    assert index.prefix('Sö', limit=10) == ['sol', 'solen']
+    assert len(index.prefix('saa', limit=10)) == 10
@@ -1,38 +1,164 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import anthropic
-from config import ANTHROPIC_API_KEY, CLAUDE_MODEL, CLAUDE_MAX_TOKENS
+from config import (
+    ANTHROPIC_API_KEY, CLAUDE_MODEL, CLAUDE_MAX_TOKENS, CLAUDE_TIMEOUT, CLAUDE_MAX_CONCURRENCY,
+    LLM_CACHE_PATH, LLM_CACHE_TTL_DAYS, LLM_CACHE_MAX_ENTRIES,
+)
+from llm_cache import LLMCache
+
+logger = logging.getLogger(__name__)
 
 client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+cache = LLMCache(LLM_CACHE_PATH, ttl_days=LLM_CACHE_TTL_DAYS, max_entries=LLM_CACHE_MAX_ENTRIES)
 
+# bounds how many per-sense calls run at once when a batch falls back
+_pool = ThreadPoolExecutor(max_workers=CLAUDE_MAX_CONCURRENCY, thread_name_prefix='claude')
 
-def improve_translation(word: str, definition_entry: dict) -> dict:
-    """
-    Call Claude Haiku to improve the Folkets translation for a single definition.
-    Adds 'improved_translation' key alongside the existing 'translation'.
-    Returns the updated definition_entry.
-    """
-    word_class = definition_entry.get('class', '')
-    folkets_translation = definition_entry.get('translation', 'none')
-    swedish_definition = definition_entry.get('definition', '')
-    synonyms = ', '.join(definition_entry.get('synonyms', []))
+# optional limiter with an acquire() method, set by bulk jobs (see enrich.py)
+rate_limiter = None
 
-    prompt = (
+# bump when a prompt template changes so cached answers to the old prompt are ignored
+IMPROVE_PROMPT_VERSION = 1
+DEFINITION_PROMPT_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Prompts
+# ---------------------------------------------------------------------------
+
+def _improve_inputs(definition_entry: dict) -> dict:
+    """The exact fields the improve-translation prompt is built from."""
+    return {
+        'class': definition_entry.get('class', ''),
+        'translation': definition_entry.get('translation', 'none'),
+        'definition': definition_entry.get('definition', ''),
+        'synonyms': ', '.join(definition_entry.get('synonyms', [])),
+    }
+
+
+def _improve_prompt(word: str, inputs: dict) -> str:
+    return (
         f'You are a Swedish to English dictionary assistant.\n'
         f'Word: "{word}"\n'
-        f'Part of speech: {word_class}\n'
-        f'Swedish definition: "{swedish_definition}"\n'
-        f'Swedish synonyms: "{synonyms}"\n'
-        f'Folkets Lexikon translation: "{folkets_translation}"\n\n'
+        f'Part of speech: {inputs["class"]}\n'
+        f'Swedish definition: "{inputs["definition"]}"\n'
+        f'Swedish synonyms: "{inputs["synonyms"]}"\n'
+        f'Folkets Lexikon translation: "{inputs["translation"]}"\n\n'
         f'Give the most natural English translation for this specific sense of the word. '
         f'Reply with only the translation, no explanation.'
     )
 
-    response = client.messages.create(
+
+def _improve_batch_prompt(word: str, senses: list) -> str:
+    lines = [
+        f'{i}. Part of speech: {inputs["class"]}; '
+        f'Swedish definition: "{inputs["definition"]}"; '
+        f'Swedish synonyms: "{inputs["synonyms"]}"; '
+        f'Folkets Lexikon translation: "{inputs["translation"]}"'
+        for i, inputs in enumerate(senses, 1)
+    ]
+    return (
+        f'You are a Swedish to English dictionary assistant.\n'
+        f'Word: "{word}"\n'
+        f'Senses:\n' + '\n'.join(lines) + '\n\n'
+        f'For each sense, give the most natural English translation for that specific sense of the word. '
+        f'Reply with only a JSON array of {len(senses)} strings, one per sense in the order given, '
+        f'no explanation.'
+    )
+
+
+def _definition_inputs(definition_entry: dict) -> dict:
+    """The exact fields the generate-definition prompt is built from."""
+    return {
+        'class': definition_entry.get('class', ''),
+        'translation': get_translation(definition_entry),
+        'synonyms': ', '.join(definition_entry.get('synonyms', [])),
+        'example': definition_entry.get('example', ''),
+    }
+
+
+def _definition_prompt(word: str, inputs: dict) -> str:
+    prompt = (
+        f'You are a Swedish dictionary editor.\n'
+        f'Word: "{word}"\n'
+        f'Part of speech: {inputs["class"]}\n'
+        f'English translation: "{inputs["translation"]}"\n'
+    )
+
+    if inputs['synonyms']:
+        prompt += f'Swedish synonyms: "{inputs["synonyms"]}"\n'
+    if inputs['example']:
+        prompt += f'Example usage: "{inputs["example"]}"\n'
+
+    prompt += (
+        f'\nWrite a concise Swedish definition (max 15 words) that explains what this word means. '
+        f'Do not include the word itself or any of its inflections in the definition. '
+        f'Reply with only the definition in Swedish, no explanation.'
+    )
+    return prompt
+
+
+def _definition_batch_prompt(word: str, senses: list) -> str:
+    lines = []
+    for i, inputs in enumerate(senses, 1):
+        line = f'{i}. Part of speech: {inputs["class"]}; English translation: "{inputs["translation"]}"'
+        if inputs['synonyms']:
+            line += f'; Swedish synonyms: "{inputs["synonyms"]}"'
+        if inputs['example']:
+            line += f'; Example usage: "{inputs["example"]}"'
+        lines.append(line)
+
+    return (
+        f'You are a Swedish dictionary editor.\n'
+        f'Word: "{word}"\n'
+        f'Senses:\n' + '\n'.join(lines) + '\n\n'
+        f'For each sense, write a concise Swedish definition (max 15 words) that explains what the word '
+        f'means in that sense. Do not include the word itself or any of its inflections in the definitions. '
+        f'Reply with only a JSON array of {len(senses)} strings in Swedish, one per sense in the order given, '
+        f'no explanation.'
+    )
+
+
+# ---------------------------------------------------------------------------
+# Single-sense calls
+# ---------------------------------------------------------------------------
+
+def _complete(prompt: str, max_tokens: int = CLAUDE_MAX_TOKENS):
+    """Send a single-turn prompt to Claude Haiku and return the raw response."""
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    return client.messages.create(
         model=CLAUDE_MODEL,
-        max_tokens=CLAUDE_MAX_TOKENS,
-        messages=[{'role': 'user', 'content': prompt}]
+        max_tokens=max_tokens,
+        messages=[{'role': 'user', 'content': prompt}],
+        timeout=CLAUDE_TIMEOUT,
     )
 
-    definition_entry['improved_translation'] = response.content[0].text.strip()
+
+def improve_translation(word: str, definition_entry: dict) -> dict:
+    """
+    Call Claude Haiku to improve the Folkets translation for a single definition.
+    Adds 'improved_translation' key alongside the existing 'translation'.
+    Answers are cached on disk, so the same sense is only paid for once.
+    Returns the updated definition_entry.
+    """
+    inputs = _improve_inputs(definition_entry)
+
+    cached = cache.get('improve_translation', CLAUDE_MODEL, IMPROVE_PROMPT_VERSION, word, inputs)
+    if cached is not None:
+        definition_entry['improved_translation'] = cached
+        return definition_entry
+
+    response = _complete(_improve_prompt(word, inputs))
+
+    improved = response.content[0].text.strip()
+    cache.put('improve_translation', CLAUDE_MODEL, IMPROVE_PROMPT_VERSION, word, inputs, improved)
+
+    definition_entry['improved_translation'] = improved
     return definition_entry
 
 
@@ -52,34 +178,216 @@ def generate_definition(word: str, definition_entry: dict) -> str:
     """
     Generate a Swedish definition when one is missing, using Claude Haiku.
     Uses the translation, word class, and any synonyms/examples as context.
+    Answers are cached on disk, so recreating a card doesn't pay again.
     """
-    word_class = definition_entry.get('class', '')
-    translation = get_translation(definition_entry)
-    synonyms = ', '.join(definition_entry.get('synonyms', []))
-    example = definition_entry.get('example', '')
+    inputs = _definition_inputs(definition_entry)
 
-    prompt = (
-        f'You are a Swedish dictionary editor.\n'
-        f'Word: "{word}"\n'
-        f'Part of speech: {word_class}\n'
-        f'English translation: "{translation}"\n'
-    )
+    cached = cache.get('generate_definition', CLAUDE_MODEL, DEFINITION_PROMPT_VERSION, word, inputs)
+    if cached is not None:
+        return cached
 
-    if synonyms:
-        prompt += f'Swedish synonyms: "{synonyms}"\n'
-    if example:
-        prompt += f'Example usage: "{example}"\n'
+    response = _complete(_definition_prompt(word, inputs))
 
-    prompt += (
-        f'\nWrite a concise Swedish definition (max 15 words) that explains what this word means. '
-        f'Do not include the word itself or any of its inflections in the definition. '
-        f'Reply with only the definition in Swedish, no explanation.'
-    )
+    definition = response.content[0].text.strip()
+    cache.put('generate_definition', CLAUDE_MODEL, DEFINITION_PROMPT_VERSION, word, inputs, definition)
+    return definition
 
-    response = client.messages.create(
-        model=CLAUDE_MODEL,
-        max_tokens=CLAUDE_MAX_TOKENS,
-        messages=[{'role': 'user', 'content': prompt}]
-    )
 
-    return response.content[0].text.strip()
\ No newline at end of file
+# ---------------------------------------------------------------------------
+# Batched multi-sense calls
+# ---------------------------------------------------------------------------
+
+def _parse_batch(text: str, expected: int) -> list[str]:
+    """
+    Parse a JSON array of `expected` non-empty strings from a reply,
+    tolerating a ```json fence. Raises ValueError if it doesn't validate.
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.strip('`')
+        text = text[text.find('['):]
+
+    start, end = text.find('['), text.rfind(']')
+    if start == -1 or end == -1:
+        raise ValueError('no JSON array in reply')
+
+    items = json.loads(text[start:end + 1])
+    if not isinstance(items, list) or len(items) != expected:
+        raise ValueError(f'expected {expected} items, got {items!r}')
+    if not all(isinstance(item, str) and item.strip() for item in items):
+        raise ValueError(f'expected non-empty strings, got {items!r}')
+
+    return [item.strip() for item in items]
+
+
+def _batch_complete(kind: str, word: str, batch_prompt: str, single_prompts: list) -> list[str]:
+    """
+    Send one request for all senses and return their answers in order.
+    Logs latency and token usage against an estimate of the per-sense calls
+    it replaces (same tokens-per-character as the batch prompt).
+    Raises on API errors or replies that don't validate.
+    """
+    start = time.perf_counter()
+    response = _complete(batch_prompt, max_tokens=CLAUDE_MAX_TOKENS * len(single_prompts) + 20)
+    latency_ms = round((time.perf_counter() - start) * 1000)
+
+    results = _parse_batch(response.content[0].text, len(single_prompts))
+
+    usage = getattr(response, 'usage', None)
+    input_tokens = getattr(usage, 'input_tokens', 0) or 0
+    output_tokens = getattr(usage, 'output_tokens', 0) or 0
+    tokens_per_char = input_tokens / len(batch_prompt) if batch_prompt else 0
+    single_input_tokens = round(sum(len(p) for p in single_prompts) * tokens_per_char)
+
+    logger.info(json.dumps({
+        'event': 'llm.batch',
+        'kind': kind,
+        'word': word,
+        'senses': len(single_prompts),
+        'latency_ms': latency_ms,
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'est_single_call_input_tokens': single_input_tokens,
+        'est_input_tokens_saved': single_input_tokens - input_tokens,
+        'round_trips_saved': len(single_prompts) - 1,
+    }, ensure_ascii=False))
+
+    return results
+
+
+def improve_translations(word: str, definition_entries: list) -> list:
+    """
+    Improve the translations of several senses of a word with one Claude call.
+    Cached senses are answered locally; the rest go in a single structured
+    request. If the reply can't be parsed, falls back to per-sense calls,
+    run concurrently on a bounded pool.
+    Adds 'improved_translation' to each entry and returns the entries.
+    """
+    missing = []
+    for entry in definition_entries:
+        inputs = _improve_inputs(entry)
+        cached = cache.get('improve_translation', CLAUDE_MODEL, IMPROVE_PROMPT_VERSION, word, inputs)
+        if cached is not None:
+            entry['improved_translation'] = cached
+        else:
+            missing.append((entry, inputs))
+
+    if len(missing) == 1:
+        improve_translation(word, missing[0][0])
+    elif missing:
+        senses = [inputs for _, inputs in missing]
+        try:
+            results = _batch_complete(
+                'improve_translation', word,
+                _improve_batch_prompt(word, senses),
+                [_improve_prompt(word, inputs) for inputs in senses],
+            )
+        except (ValueError, anthropic.APIError) as e:
+            logger.warning(f'Batched translation for "{word}" failed, falling back per sense: {e}')
+            futures = [_pool.submit(improve_translation, word, entry) for entry, _ in missing]
+            for future in futures:
+                future.result()
+        else:
+            for (entry, inputs), improved in zip(missing, results):
+                cache.put('improve_translation', CLAUDE_MODEL, IMPROVE_PROMPT_VERSION, word, inputs, improved)
+                entry['improved_translation'] = improved
+
+    return definition_entries
+
+
+def generate_definitions(word: str, definition_entries: list) -> list[str]:
+    """
+    Generate Swedish definitions for several senses of a word with one Claude call.
+    Cached senses are answered locally; the rest go in a single structured
+    request. If the reply can't be parsed, falls back to per-sense calls,
+    run concurrently on a bounded pool.
+    Returns one definition per entry, in order.
+    """
+    definitions = [None] * len(definition_entries)
+    missing = []
+    for i, entry in enumerate(definition_entries):
+        inputs = _definition_inputs(entry)
+        cached = cache.get('generate_definition', CLAUDE_MODEL, DEFINITION_PROMPT_VERSION, word, inputs)
+        if cached is not None:
+            definitions[i] = cached
+        else:
+            missing.append((i, inputs))
+
+    if len(missing) == 1:
+        i, _ = missing[0]
+        definitions[i] = generate_definition(word, definition_entries[i])
+    elif missing:
+        senses = [inputs for _, inputs in missing]
+        try:
+            results = _batch_complete(
+                'generate_definition', word,
+                _definition_batch_prompt(word, senses),
+                [_definition_prompt(word, inputs) for inputs in senses],
+            )
+        except (ValueError, anthropic.APIError) as e:
+            logger.warning(f'Batched definitions for "{word}" failed, falling back per sense: {e}')
+            futures = {i: _pool.submit(generate_definition, word, definition_entries[i]) for i, _ in missing}
+            for i, future in futures.items():
+                definitions[i] = future.result()
+        else:
+            for (i, inputs), definition in zip(missing, results):
+                cache.put('generate_definition', CLAUDE_MODEL, DEFINITION_PROMPT_VERSION, word, inputs, definition)
+                definitions[i] = definition
+
+    return definitions
+
+
+# ---------------------------------------------------------------------------
+# Cached answers on lexicon reads
+# ---------------------------------------------------------------------------
+
+def apply_cached_answers(word: str, details: dict) -> dict:
+    """
+    Lexicon read hook: fill in cached improved translations and generated
+    definitions (e.g. from `python enrich.py`) so /lookup returns them
+    without an API call. A cached answer is only applied to a sense whose
+    current fields match the ones it was generated from, and never replaces
+    a value the entry already has. Improvements go first, since the
+    definition prompt is built from the best available translation.
+
+    Returns a copy when anything was filled in, otherwise `details` itself —
+    the stored entry is never modified.
+    """
+    improvements = cache.word_entries('improve_translation', CLAUDE_MODEL, IMPROVE_PROMPT_VERSION, word)
+    definitions = cache.word_entries('generate_definition', CLAUDE_MODEL, DEFINITION_PROMPT_VERSION, word)
+    if not improvements and not definitions:
+        return details
+
+    senses = []
+    changed = False
+    for sense in details['definitions']:
+        sense = dict(sense)
+        if not sense.get('improved_translation'):
+            inputs = _improve_inputs(sense)
+            improved = next((result for cached, result in improvements if cached == inputs), None)
+            if improved is not None:
+                sense['improved_translation'] = improved
+                changed = True
+        if not sense.get('definition'):
+            inputs = _definition_inputs(sense)
+            definition = next((result for cached, result in definitions if cached == inputs), None)
+            if definition is not None:
+                sense['definition'] = definition
+                changed = True
+        senses.append(sense)
+
+    return {**details, 'definitions': senses} if changed else details
+
+
+def cached_improved_senses(word_data):
+    """
+    Yield (word, definition_index, definition) for every sense that
+    apply_cached_answers gives an improved translation, so the reverse index
+    can include them. One pass over the cache; word_data is only read.
+    """
+    for word, inputs, improved in cache.entries('improve_translation', CLAUDE_MODEL, IMPROVE_PROMPT_VERSION):
+        if word not in word_data:
+            continue
+        for i, sense in enumerate(word_data[word]['definitions']):
+            if not sense.get('improved_translation') and _improve_inputs(sense) == inputs:
+                yield word, i, {**sense, 'improved_translation': improved}